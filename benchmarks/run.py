@@ -0,0 +1,322 @@
+"""
+Benchmarks of hot paths (run from the root of the repository):
+    python -m benchmarks.run                       # run all benchmarks
+    python -m benchmarks.run -k protocol           # run benchmarks which names contain "protocol"
+    python -m benchmarks.run --save baseline.json  # save results as a baseline
+    python -m benchmarks.run --compare baseline.json
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import random
+import socket
+import tempfile
+import threading
+import time
+
+import pygame
+import pymunk
+
+from scripts.camera import Camera
+from scripts.converters import convert_str_movement_into_list
+from scripts.field import Field, GameStatus
+from scripts.map import Map
+from scripts.player import Player, PlayerRole
+from scripts.replay import ReplayLog, append_replay, encode_replay
+from scripts.settings import ACTION_TIME, SERVER_TICK, SIZE
+from scripts.simulation import Simulation
+from server.map_format import compile_map
+from server.collision import find_contacts, find_first_contact
+from server.trajectory import decode_trajectory, encode_trajectory
+from server.transfer_messages import receive_message, send_message
+
+BENCHMARKS = []
+
+
+def benchmark(name: str, repeat: int = 200):
+    """Register a benchmark. Decorated function prepares data and returns the function to measure
+    or (function to measure, function which frees resources after measuring)"""
+    def decorator(setup):
+        BENCHMARKS.append((name, setup, repeat))
+        return setup
+    return decorator
+
+
+def measure(func, repeat: int) -> dict:
+    func()  # Warm up
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        func()
+        latencies.append(time.perf_counter_ns() - start)
+    latencies.sort()
+    total = sum(latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] / 1000
+
+    return {
+        "ops_per_s": repeat / (total / 1e9) if total else float("inf"),
+        "p50_us": percentile(50),
+        "p90_us": percentile(90),
+        "p99_us": percentile(99),
+        "max_us": latencies[-1] / 1000,
+    }
+
+
+# --- Data generators ---
+def random_movement(ticks: int, seed: int = 0) -> list[tuple[float, float]]:
+    rng = random.Random(seed)
+    x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+    movement = []
+    for _ in range(ticks):
+        x += rng.uniform(-30, 30)
+        y += rng.uniform(-30, 30)
+        movement.append((x, y))
+    return movement
+
+
+def generated_map(walls: int, size: int = 20000) -> dict:
+    rng = random.Random(walls)
+    return {
+        "name": f"Generated ({walls} walls)", "rounds": 1, "time": 10,
+        "map_size": {"width": size, "height": size},
+        "catcher_start_pos": [{"x": 50, "y": 50}],
+        "runner_start_pos": [{"x": size - 50, "y": size - 50}],
+        "walls": [{"pos": {"x": rng.randrange(size), "y": rng.randrange(size)},
+                   "size": {"width": rng.randrange(10, 200), "height": rng.randrange(10, 200)}} for _ in range(walls)],
+    }
+
+
+def simulation(players: int) -> Simulation:
+    ticks = int(ACTION_TIME * SERVER_TICK / 1000)
+    roles = [PlayerRole.CATCHER if i % 4 == 0 else PlayerRole.RUNNER for i in range(players)]
+    movements = [random_movement(ticks, seed) for seed in range(players)]
+    return Simulation([f"Player {i}" for i in range(players)], roles, movements, Map(pymunk.Space()), SERVER_TICK)
+
+
+# --- Protocol ---
+def protocol_benchmark(size: int):
+    def setup():
+        a, b = socket.socketpair()
+        payload = "x" * size
+
+        def echo():
+            try:
+                while True:
+                    for msg in receive_message(b, DEBUG=False):
+                        send_message(b, msg["type"], msg["action"], msg["parameters"], DEBUG=False)
+            except Exception:
+                b.close()
+        thread = threading.Thread(target=echo, daemon=True)
+        thread.start()
+
+        def round_trip():
+            send_message(a, "game", "movement", payload, DEBUG=False)
+            receive_message(a, 65536, DEBUG=False)
+
+        def cleanup():
+            a.close()  # The echo thread gets EOF and closes b
+            thread.join(1)
+        return round_trip, cleanup
+    return setup
+
+
+for payload_size in (64, 4 * 1024, 64 * 1024, 1024 * 1024):
+    benchmark(f"protocol round trip {payload_size} B", repeat=50 if payload_size >= 1024 * 1024 else 500)(protocol_benchmark(payload_size))
+
+
+# --- Converters ---
+@benchmark("converters convert_str_movement_into_list (200 ticks)")
+def _():
+    data = str(random_movement(200))
+    return lambda: convert_str_movement_into_list(data)
+
+
+@benchmark("converters decode_trajectory (200 ticks)")
+def _():
+    data = encode_trajectory(random_movement(200))
+    return lambda: decode_trajectory(data)
+
+
+@benchmark("converters encode_trajectory (200 ticks)")
+def _():
+    movement = random_movement(200)
+    return lambda: encode_trajectory(movement)
+
+
+# --- Simulation ---
+for players_amount in (2, 16, 128):
+    @benchmark(f"simulation update ({players_amount} players)", repeat=1000)
+    def _(players_amount=players_amount):
+        sim = simulation(players_amount)
+        sim.start()
+
+        def update():
+            sim.update(1)
+            if sim.get_time() >= ACTION_TIME or sim.is_paused:
+                sim.move_to(0)
+                sim.start()
+        return update
+
+    @benchmark(f"simulation check_collision_between_catcher_and_runner ({players_amount} players)", repeat=1000)
+    def _(players_amount=players_amount):
+        sim = simulation(players_amount)
+        sim.move_to(ACTION_TIME / 2)
+        return sim.check_collision_between_catcher_and_runner
+
+    @benchmark(f"collision find_first_contact ({players_amount} players)", repeat=20)
+    def _(players_amount=players_amount):
+        sim = simulation(players_amount)
+        return lambda: find_first_contact(sim.trajectories, sim.is_catcher, 20, 1000 / SERVER_TICK)
+
+    @benchmark(f"collision find_contacts ({players_amount} players)", repeat=1000)
+    def _(players_amount=players_amount):
+        sim = simulation(players_amount)
+        positions = sim.get_positions_at(ACTION_TIME / 2)
+        return lambda: find_contacts(positions, sim.is_catcher, 20)
+
+
+@benchmark("simulation get_positions (1000 timestamps, 16 players)")
+def _():
+    sim = simulation(16)
+    times = [i * ACTION_TIME / 1000 for i in range(1000)]
+    return lambda: sim.get_positions(times)
+
+
+@benchmark("replay open round and seek (1000 rounds in the log, 16 players)", repeat=1000)
+def _():
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "replays.ctr")
+    sim = simulation(16)
+    replay = encode_replay(sim.players_names, sim.is_catcher, sim.trajectories, sim.server_ticks_in_ms, "runner", None)
+    for _ in range(1000):
+        append_replay(path, replay)
+    log = ReplayLog(path)
+    game_map = Map(pymunk.Space())
+    rng = random.Random(0)
+
+    def seek():
+        Simulation.from_replay(log[rng.randrange(len(log))], game_map).move_to(rng.uniform(0, ACTION_TIME))
+    return seek, directory.cleanup
+
+
+# --- Map ---
+for walls_amount in (100, 10000):
+    @benchmark(f"map set_map ({walls_amount} walls)", repeat=5 if walls_amount > 1000 else 50)
+    def _(walls_amount=walls_amount):
+        data = generated_map(walls_amount)
+        return lambda: Map(pymunk.Space()).set_map(data)
+
+    @benchmark(f"map load_raw_data ({walls_amount} walls)", repeat=5 if walls_amount > 1000 else 50)
+    def _(walls_amount=walls_amount):
+        raw_data = json.dumps(generated_map(walls_amount))
+        return lambda: Map(pymunk.Space()).load_raw_data(raw_data)
+
+    @benchmark(f"map load compiled ({walls_amount} walls)", repeat=50)
+    def _(walls_amount=walls_amount):
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "map.ctm")
+        with open(path, "wb") as file:
+            file.write(compile_map(generated_map(walls_amount)))
+        return (lambda: Map(pymunk.Space()).load(path)), directory.cleanup
+
+    @benchmark(f"map draw, moving camera ({walls_amount} walls)", repeat=100)
+    def _(walls_amount=walls_amount):
+        game_map = Map(pymunk.Space())
+        game_map.set_map(generated_map(walls_amount))
+        screen = pygame.Surface(SIZE)
+        camera = Camera(x=0, y=0, distance=4000, resolution=SIZE)
+
+        def draw():
+            camera.move_right(1, 16)
+            game_map.draw(screen, camera)
+        return draw
+
+    @benchmark(f"map draw_static ({walls_amount} walls)", repeat=20)
+    def _(walls_amount=walls_amount):
+        game_map = Map(pymunk.Space())
+        game_map.set_map(generated_map(walls_amount))
+        screen = pygame.Surface(SIZE)
+        camera = Camera(x=0, y=0, distance=20000, resolution=SIZE)
+        return lambda: game_map.draw_static(screen, camera)
+
+    @benchmark(f"map wall queries: rect, point, segment ({walls_amount} walls)", repeat=500)
+    def _(walls_amount=walls_amount):
+        game_map = Map(pymunk.Space())
+        game_map.set_map(generated_map(walls_amount))
+
+        def query():
+            game_map.get_walls_in_rect((9000, 9000, 10000, 9700))
+            game_map.get_walls_at_point(10000, 10000)
+            game_map.get_walls_on_segment((1000, 1000), (1300, 1200))
+        return query
+
+
+# --- Field ---
+@benchmark("field draw (preparing screen)", repeat=300)
+def _():
+    space = pymunk.Space()
+    player = Player(uuid="1", name="Player", role=PlayerRole.RUNNER, pos=(100, 100))
+    player.add_to_space(space)
+    field = Field(space, player)
+    field.map.load("server/first_map.json")
+    screen = pygame.Surface(SIZE)
+    camera = Camera(x=0, y=0, distance=1000, resolution=SIZE)
+    return lambda: field.draw(screen, camera)
+
+
+@benchmark("field draw (simulation, 16 players)", repeat=300)
+def _():
+    space = pymunk.Space()
+    player = Player(uuid="1", name="Player", role=PlayerRole.RUNNER, pos=(100, 100))
+    field = Field(space, player)
+    field.simulation = simulation(16)
+    field.simulation.map.load("server/first_map.json")
+    field.game_status = GameStatus.SIMULATION
+    screen = pygame.Surface(SIZE)
+    camera = Camera(x=0, y=0, distance=1000, resolution=SIZE)
+    return lambda: field.draw(screen, camera)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks of Catch Trought Time hot paths")
+    parser.add_argument("-k", dest="keyword", default="", help="run only benchmarks which names contain this text")
+    parser.add_argument("--save", help="save results into JSON file")
+    parser.add_argument("--compare", help="compare results with JSON file")
+    args = parser.parse_args()
+
+    pygame.init()
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+
+    results = {}
+    print(f"{'benchmark':<70} {'ops/s':>12} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10}" + ("  vs baseline" if baseline else ""))
+    for name, setup, repeat in BENCHMARKS:
+        if args.keyword not in name:
+            continue
+        func = setup()
+        func, cleanup = func if isinstance(func, tuple) else (func, None)
+        try:
+            result = measure(func, repeat)
+        finally:
+            if cleanup is not None:
+                cleanup()
+        results[name] = result
+        line = f"{name:<70} {result['ops_per_s']:>12.1f} {result['p50_us']:>10.1f} {result['p90_us']:>10.1f} {result['p99_us']:>10.1f}"
+        if name in baseline:
+            line += f"  x{baseline[name]['p50_us'] / result['p50_us']:.2f} (p50 speedup)"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,30 @@
 # Python version: 3.11.2
+import argparse
 
 from scripts.app import App
+from scripts.headless import ScriptedInput
+from server.logs import setup_logging
 
 if __name__ == "__main__":
-    app = App()
+    parser = argparse.ArgumentParser(description="Catch Trought Time client")
+    parser.add_argument("--headless", action="store_true", help="run without a window (SDL dummy video driver)")
+    parser.add_argument("--no-render", action="store_true", help="skip rendering in headless mode")
+    parser.add_argument("--script", help="JSON input script used instead of mouse and keyboard")
+    parser.add_argument("--frames", type=int, help="exit after this amount of frames")
+    parser.add_argument("--rounds", type=int, help="exit after this amount of finished rounds")
+    parser.add_argument("--fps", type=int, help="frame rate limit (0 - unlimited)")
+    parser.add_argument("--log-level", default="INFO", help="level of client logs")
+    parser.add_argument("--protocol-log-level", default="WARNING", help="DEBUG - log every network message")
+    args = parser.parse_args()
 
-    while True:
-        app.update()
\ No newline at end of file
+    setup_logging(args.log_level, args.protocol_log_level)
+
+    app = App(headless=args.headless,
+              render=not args.no_render,
+              input_script=ScriptedInput.load(args.script) if args.script else None,
+              max_frames=args.frames,
+              max_rounds=args.rounds,
+              fps=args.fps)
+
+    while app.is_running:
+        app.update()
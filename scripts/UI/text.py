@@ -1,21 +1,46 @@
 import pygame
+from collections import OrderedDict
 
 
 # Class Text - represents text in the model (this class optimizes the use of fonts and a text surface
 # because pygame.font.Font is very slow)
 class Text:
-    fonts = {}  # Dictionary of fonts
+    fonts = {}  # Dictionary of fonts {(type_font, size_font): font}
+    surfaces = OrderedDict()  # LRU cache of rendered texts {(text, color, size_font, type_font): surface}
+    max_surfaces = 512  # Max amount of cached surfaces
+    hits = 0
+    misses = 0
 
     def __init__(self, text: str, color: list[int, int, int], size_font: int, type_font: str = None) -> None:
-        if size_font in Text.fonts:
-            self.font = Text.fonts[size_font]
+        key = (text, tuple(color), size_font, type_font)
+        surface = Text.surfaces.get(key)
+        if surface is not None:
+            Text.hits += 1
+            Text.surfaces.move_to_end(key)
         else:
+            Text.misses += 1
+            surface = Text.get_font(size_font, type_font).render(text, True, color)
+            Text.surfaces[key] = surface
+            if len(Text.surfaces) > Text.max_surfaces:
+                Text.surfaces.popitem(last=False)
+        self.text_surface = surface
+
+    @staticmethod
+    def get_font(size_font: int, type_font: str = None) -> pygame.font.Font:
+        key = (type_font, size_font)
+        if key not in Text.fonts:
             if type_font:
-                self.font = pygame.font.Font("fonts/" + type_font + ".ttf", size_font)
+                Text.fonts[key] = pygame.font.Font("fonts/" + type_font + ".ttf", size_font)
             else:
-                self.font = pygame.font.Font(None, size_font)
-            Text.fonts[size_font] = self.font
-        self.text_surface = self.font.render(text, True, color)
+                Text.fonts[key] = pygame.font.Font(None, size_font)
+        return Text.fonts[key]
+
+    @staticmethod
+    def clear_cache() -> None:
+        Text.fonts = {}
+        Text.surfaces.clear()
+        Text.hits = 0
+        Text.misses = 0
 
     def print(self, screen: pygame.Surface, pos: list[float, float], center: bool = False) -> None:
         if center:
@@ -0,0 +1,242 @@
+"""
+Batch analytics of replay logs (run from the root of the repository):
+    python -m scripts.analytics replays/                          # summary of every map
+    python -m scripts.analytics replays/ --csv rounds.csv         # + result of every round
+    python -m scripts.analytics replays/ --heatmaps heatmaps/     # + positions heatmaps (<map hash>.npz)
+    python -m scripts.analytics replays/ --maps server/first_map.json --workers 8
+
+Rounds are replayed again with Simulation (the same interpolation and catch detection as in the game)
+in a pool of processes, so the recorded result can be compared with the computed one.
+Sizes of maps for heatmaps are taken from the map cache and from --maps.
+"""
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import csv
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pymunk
+
+from scripts.map import Map
+from scripts.map_cache import MapCache, get_map_hash
+from scripts.replay import ReplayError, ReplayLog
+from scripts.settings import MAP_CACHE_DIR
+from scripts.simulation import Simulation
+from server.map_format import EXTENSION as MAP_EXTENSION, compiled_map_to_dict, load_compiled_map
+
+CHUNK_SIZE = 500  # Rounds in one task of the pool
+CELL_SIZE = 50  # px, size of a heatmap cell
+COLUMNS = ("path", "number", "map_hash", "played_at", "players", "catchers", "winner", "catch_time_in_ms",
+           "computed_winner", "computed_catch_time_in_ms", "runner_distance", "catcher_distance", "closest_approach")
+
+# Data of a worker process (see init_worker)
+MAP = None
+MAP_SIZES = {}
+HEATMAP_CELL_SIZE = CELL_SIZE
+LOGS = {}
+
+
+def init_worker(map_sizes: dict, cell_size: float) -> None:
+    global MAP, MAP_SIZES, HEATMAP_CELL_SIZE
+
+    MAP = Map(pymunk.Space())  # Walls are not used, catches only depend on trajectories
+    MAP_SIZES = map_sizes
+    HEATMAP_CELL_SIZE = cell_size
+
+
+def get_heatmap_edges(size: tuple[int, int], cell_size: float) -> tuple[np.ndarray, np.ndarray]:
+    width, height = size
+    return np.arange(0, width + cell_size, cell_size), np.arange(0, height + cell_size, cell_size)
+
+
+def analyze_round(simulation: Simulation) -> tuple[np.ndarray, np.ndarray, float, float, float]:
+    """
+    This function find distances and the closest approach of catchers and runners in one round
+    (up to the catch or the end of the round)
+    :param simulation: Simulation of the round
+    :return: (positions at every tick (ticks, players, 2), is catcher (players,),
+              mean runner distance, mean catcher distance, closest distance between a catcher and a runner)
+    """
+    ticks = simulation.trajectories.shape[1]
+    end = (ticks - 1) * simulation.server_ticks_in_ms if simulation.catch_time_in_ms is None else simulation.catch_time_in_ms
+    times = np.arange(ticks) * simulation.server_ticks_in_ms
+    positions = simulation.get_positions(np.append(times[times < end], end))
+
+    is_catcher = np.asarray(simulation.is_catcher, dtype=bool)
+    distances = np.hypot(*np.diff(positions, axis=0).T).sum(axis=1)  # (players,)
+    runner_distance = float(distances[~is_catcher].mean()) if (~is_catcher).any() else np.nan
+    catcher_distance = float(distances[is_catcher].mean()) if is_catcher.any() else np.nan
+    closest_approach = np.nan
+    if is_catcher.any() and (~is_catcher).any():
+        relative = positions[:, ~is_catcher][:, None] - positions[:, is_catcher][:, :, None]
+        closest_approach = float(np.hypot(relative[..., 0], relative[..., 1]).min())
+    return positions, is_catcher, runner_distance, catcher_distance, closest_approach
+
+
+def analyze_chunk(path: str, start: int, stop: int) -> tuple[list[tuple], dict]:
+    """
+    This function analyze rounds start..stop of the replay log (runs in a worker process)
+    :param path: Path of the replay log
+    :param start: Number of the first round
+    :param stop: Number after the last round
+    :return: (rows (see COLUMNS), {map hash: (catchers heatmap, runners heatmap)})
+    """
+    if path not in LOGS:
+        LOGS[path] = ReplayLog(path)
+    log = LOGS[path]
+
+    rows = []
+    samples = {}  # map hash: ([positions], [is catcher])
+    for number in range(start, stop):
+        try:
+            replay = log[number]
+        except ReplayError:
+            continue
+        simulation = Simulation.from_replay(replay, MAP, use_recorded_result=False)
+        positions, is_catcher, runner_distance, catcher_distance, closest_approach = analyze_round(simulation)
+        computed_winner = "runner" if simulation.catch_time_in_ms is None else "catcher"
+        rows.append((path, number, replay.map_hash, replay.played_at, len(replay.names), int(is_catcher.sum()),
+                     replay.winner, replay.catch_time_in_ms, computed_winner, simulation.catch_time_in_ms,
+                     runner_distance, catcher_distance, closest_approach))
+        if replay.map_hash in MAP_SIZES:
+            map_samples = samples.setdefault(replay.map_hash, ([], []))
+            map_samples[0].append(positions.reshape(-1, 2))
+            map_samples[1].append(np.tile(is_catcher, len(positions)))
+
+    # One histogram of all rounds of the chunk for every map
+    heatmaps = {}
+    for map_hash, (positions, is_catcher) in samples.items():
+        positions, is_catcher = np.concatenate(positions), np.concatenate(is_catcher)
+        x_edges, y_edges = get_heatmap_edges(MAP_SIZES[map_hash], HEATMAP_CELL_SIZE)
+        heatmaps[map_hash] = tuple(np.histogram2d(positions[mask, 0], positions[mask, 1], bins=(x_edges, y_edges))[0]
+                                   for mask in (is_catcher, ~is_catcher))
+    return rows, heatmaps
+
+
+def find_replay_logs(paths: list[str]) -> list[str]:
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            logs.extend(sorted(glob.glob(os.path.join(path, "**", "*.ctr"), recursive=True)))
+        else:
+            logs.append(path)
+    return logs
+
+
+def load_map_sizes(map_paths: list[str], cache_directory: str = MAP_CACHE_DIR) -> dict:
+    """
+    This function find sizes of known maps by their hash (maps from the map cache and map files)
+    :param map_paths: Paths of maps (JSON or compiled)
+    :param cache_directory: Directory of the map cache
+    :return: {map hash: (width, height)}
+    """
+    cache = MapCache(cache_directory)
+    raw_maps = [cache.get(os.path.splitext(name)[0]) for name in (os.listdir(cache_directory) if os.path.isdir(cache_directory) else [])]
+    for path in map_paths:
+        # The server sends maps in compact JSON, the hash is calculated from it
+        if path.endswith(MAP_EXTENSION):
+            data = compiled_map_to_dict(load_compiled_map(path))
+        else:
+            with open(path, "r") as file:
+                data = json.load(file)
+        raw_maps.append(json.dumps(data, separators=(",", ":")))
+
+    sizes = {}
+    for raw_data in raw_maps:
+        if raw_data is None:
+            continue
+        size = json.loads(raw_data)["map_size"]
+        sizes[get_map_hash(raw_data)] = (size["width"], size["height"])
+    return sizes
+
+
+def analyze(paths: list[str], map_sizes: dict, workers: int = None, cell_size: float = CELL_SIZE) -> tuple[list[tuple], dict]:
+    """
+    This function analyze all rounds of replay logs in a pool of processes
+    :param paths: Paths of replay logs
+    :param map_sizes: {map hash: (width, height)} of maps for heatmaps
+    :param workers: Amount of processes (all cores by default)
+    :param cell_size: Size of a heatmap cell in px
+    :return: (rows (see COLUMNS), {map hash: (catchers heatmap, runners heatmap)})
+    """
+    tasks = [(path, start, min(start + CHUNK_SIZE, len(log)))
+             for path, log in ((path, ReplayLog(path)) for path in paths)
+             for start in range(0, len(log), CHUNK_SIZE)]
+
+    rows = []
+    heatmaps = {}
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(map_sizes, cell_size)) as pool:
+        for chunk_rows, chunk_heatmaps in pool.map(analyze_chunk, *zip(*tasks)) if tasks else ():
+            rows.extend(chunk_rows)
+            for map_hash, (catchers, runners) in chunk_heatmaps.items():
+                if map_hash in heatmaps:
+                    heatmaps[map_hash][0][...] += catchers
+                    heatmaps[map_hash][1][...] += runners
+                else:
+                    heatmaps[map_hash] = (catchers, runners)
+    return rows, heatmaps
+
+
+def summarize(rows: list[tuple]) -> dict:
+    """
+    This function aggregate results of rounds by map
+    :param rows: Rows (see COLUMNS)
+    :return: {map hash: {statistic: value}}
+    """
+    summary = {}
+    by_map = {}
+    for row in rows:
+        by_map.setdefault(row[COLUMNS.index("map_hash")], []).append(row)
+    for map_hash, map_rows in by_map.items():
+        columns = dict(zip(COLUMNS, zip(*map_rows)))
+        computed_catch_times = np.array([np.nan if time is None else time for time in columns["computed_catch_time_in_ms"]])
+        summary[map_hash] = {
+            "rounds": len(map_rows),
+            "catcher_wins": float(np.mean([winner == "catcher" for winner in columns["computed_winner"]])),
+            "mismatches": sum(winner is not None and winner != computed
+                              for winner, computed in zip(columns["winner"], columns["computed_winner"])),
+            "catch_time_in_ms": float(np.nanmean(computed_catch_times)) if np.isfinite(computed_catch_times).any() else np.nan,
+            "runner_distance": float(np.nanmean(columns["runner_distance"])),
+            "catcher_distance": float(np.nanmean(columns["catcher_distance"])),
+            "closest_approach": float(np.nanmean(columns["closest_approach"])),
+        }
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Analytics of recorded rounds")
+    parser.add_argument("replays", nargs="+", help="replay logs or directories with them (*.ctr)")
+    parser.add_argument("--maps", nargs="*", default=[], help="maps played on servers (for heatmaps of maps which are not in the map cache)")
+    parser.add_argument("--workers", type=int, help="amount of processes (all cores by default)")
+    parser.add_argument("--cell-size", type=float, default=CELL_SIZE, help="size of a heatmap cell in px")
+    parser.add_argument("--csv", help="save the result of every round into CSV file")
+    parser.add_argument("--heatmaps", help="save heatmaps of positions into this directory")
+    args = parser.parse_args()
+
+    map_sizes = load_map_sizes(args.maps)
+    rows, heatmaps = analyze(find_replay_logs(args.replays), map_sizes, args.workers, args.cell_size)
+
+    print(f"{'map':<16} {'rounds':>8} {'catcher wins':>13} {'mismatches':>11} {'catch ms':>9} {'runner px':>10} {'catcher px':>11} {'closest px':>11}")
+    for map_hash, statistics in sorted(summarize(rows).items(), key=lambda item: -item[1]["rounds"]):
+        print(f"{(map_hash or 'unknown')[:16]:<16} {statistics['rounds']:>8} {statistics['catcher_wins']:>13.1%} {statistics['mismatches']:>11} "
+              f"{statistics['catch_time_in_ms']:>9.0f} {statistics['runner_distance']:>10.0f} {statistics['catcher_distance']:>11.0f} "
+              f"{statistics['closest_approach']:>11.1f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(COLUMNS)
+            writer.writerows(rows)
+    if args.heatmaps:
+        os.makedirs(args.heatmaps, exist_ok=True)
+        for map_hash, (catchers, runners) in heatmaps.items():
+            x_edges, y_edges = get_heatmap_edges(map_sizes[map_hash], args.cell_size)
+            np.savez(os.path.join(args.heatmaps, f"{map_hash}.npz"), catchers=catchers, runners=runners, x_edges=x_edges, y_edges=y_edges)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import logging
+import os
 import pygame
 import pymunk.pygame_util
 import pymunk
@@ -6,20 +8,45 @@ import random
 from scripts.player import Player, PlayerRole
 import scripts.settings as s
 from scripts.camera import Camera
-from scripts.field import Field
+from scripts.field import Field, GameStatus
+from scripts.headless import ScriptedInput
+from scripts.profiler import profiler
 from scripts.UI.text import Text
 
+logger = logging.getLogger("ctt.client")
+
 
 class App:
 
-    def __init__(self) -> None:
+    def __init__(self, headless: bool = False, render: bool = True, input_script: ScriptedInput = None,
+                 max_frames: int = None, max_rounds: int = None, fps: int = None) -> None:
+        """
+        :param headless: Use SDL dummy video driver instead of a window (for CI, benchmarks and bots)
+        :param render: Draw frames (can be switched off in headless mode)
+        :param input_script: Scripted input used instead of mouse and keyboard
+        :param max_frames: Stop after this amount of frames
+        :param max_rounds: Stop after this amount of finished rounds
+        :param fps: Frame rate limit (settings by default)
+        """
         # Initialize pygame and settings
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
         pygame.init()
 
         self.size = self.width, self.height = s.SIZE
         self.name = s.NAME
         self.colors = s.COLORS
-        self.fps = s.FPS
+        self.fps = s.FPS if fps is None else fps
+
+        self.headless = headless
+        self.render = render or not headless
+        self.input_script = input_script
+        self.max_frames = max_frames
+        self.max_rounds = max_rounds
+        self.frame = 0
+        self.finished_rounds = 0
+        self.is_running = True
 
         # Set pygame window
         pygame.display.set_caption(self.name)
@@ -28,6 +55,11 @@ class App:
         self.screen = pygame.display.set_mode(self.size)
         self.clock = pygame.time.Clock()
 
+        # Fixed timestep physics
+        self.physics_step_in_ms = 1000 / s.PHYSICS_TICK
+        self.physics_accumulator = 0
+        self.physics_alpha = 1  # Progress between two last physics states (for rendering)
+
         # Set input variables
         self.dt = 0
         self.mouse_pos = (0, 0)
@@ -57,12 +89,21 @@ class App:
         """
 
         # -*-*- Input Block -*-*-
-        self.mouse_pos = pygame.mouse.get_pos()  # Get mouse position
+        block_start = profiler.start()
+        if self.input_script:
+            for event in self.input_script.get_events(self.frame):
+                pygame.event.post(event)
+            self.mouse_pos = self.input_script.mouse_pos
+        else:
+            self.mouse_pos = pygame.mouse.get_pos()  # Get mouse position
 
         for event in pygame.event.get():  # Get all events
             if event.type == pygame.QUIT:  # If you want to close the program...
-                Text.fonts = {}  # Clear fonts
-                self.field.sock.close()
+                Text.clear_cache()  # Clear fonts and rendered texts
+                self.field.disconnect()
+                if self.headless:
+                    self.stop()
+                    return
                 close()
 
             if event.type == pygame.MOUSEBUTTONDOWN:  # If mouse button down...
@@ -84,6 +125,8 @@ class App:
                     self.field.switch_ready_state()
                 if event.key == pygame.K_l:
                     self.field.launch_simulation()
+                if event.key == pygame.K_p:
+                    logger.info("Trace is saved: %s", profiler.export_chrome_trace())
 
         self.keys = pygame.key.get_pressed()  # Get all keys (pressed or not)
         if self.keys[pygame.K_LEFT] or self.keys[pygame.K_a]:
@@ -98,18 +141,67 @@ class App:
             self.camera.scale_in(1, self.dt)
         if self.keys[pygame.K_q]:
             self.camera.scale_out(1, self.dt)
+        profiler.stop("Input", block_start)
         # -*-*-             -*-*-
 
         # -*-*- Physics Block -*-*-
-        self.space.step(self.dt / 1000)
-        self.field.update(self.dt, self.camera.get_global_point(*self.mouse_pos))
-        
+        block_start = profiler.start()
+        global_mouse_pos = self.camera.get_global_point(*self.mouse_pos)
+        self.physics_accumulator += self.dt
+        steps = 0
+        while self.physics_accumulator >= self.physics_step_in_ms and steps < s.MAX_PHYSICS_STEPS:
+            self.field.physics_step(self.physics_step_in_ms, global_mouse_pos, s.PHYSICS_SUBSTEPS)
+            self.physics_accumulator -= self.physics_step_in_ms
+            steps += 1
+        if steps == s.MAX_PHYSICS_STEPS:
+            # Too slow frame, drop the rest instead of spiralling
+            self.physics_accumulator = min(self.physics_accumulator, self.physics_step_in_ms)
+        self.physics_alpha = self.physics_accumulator / self.physics_step_in_ms
+
+        game_status = self.field.game_status
+        field_start = profiler.start()
+        self.field.update(self.dt, global_mouse_pos)
+        profiler.stop("Field.update", field_start)
+        if self.field.game_status == GameStatus.RESULTS and game_status != GameStatus.RESULTS:
+            self.finished_rounds += 1
+        profiler.stop("Physics", block_start)
         # -*-*-               -*-*-
 
         # -*-*- Rendering Block -*-*-
+        block_start = profiler.start()
+        if self.render:
+            self.draw()
+        profiler.stop("Rendering", block_start)
+        # -*-*-                 -*-*-
+
+        # -*-*- Update Block -*-*-
+        block_start = profiler.start()
+        if self.render:
+            pygame.display.update()
+        profiler.stop("Update", block_start)
+        profiler.end_frame()
+
+        self.dt = self.clock.tick(self.fps)
+
+        self.frame += 1
+        if self.max_frames is not None and self.frame >= self.max_frames or\
+                self.max_rounds is not None and self.finished_rounds >= self.max_rounds:
+            self.stop()
+        # -*-*-              -*-*-
+
+    def stop(self) -> None:
+        """
+        This function stop the main loop without exiting the process (used by headless clients)
+        """
+        self.is_running = False
+        self.field.disconnect()
+
+    def draw(self) -> None:
         self.screen.fill(self.colors['background'])  # Fill background
 
-        self.field.draw(self.screen, self.camera)
+        field_start = profiler.start()
+        self.field.draw(self.screen, self.camera, self.physics_alpha)
+        profiler.stop("Field.draw", field_start)
 
         if s.DEBUG: 
             screen_pos = self.mouse_pos
@@ -121,15 +213,10 @@ class App:
 
             self.camera.draw_map_scale(self.screen, offset=(140, 15))  # Draw map scale
             Text("FPS: " + str(int(self.clock.get_fps())), [0, 0, 0], 20).print(self.screen, [self.width - 70, self.height - 21], False)  # FPS counter
-        # -*-*-                 -*-*-
-
-        # -*-*- Update Block -*-*-
-        pygame.display.update()
-
-        self.dt = self.clock.tick(self.fps)
-        # -*-*-              -*-*-
+            Text(f"Text cache: {Text.hits} hits, {Text.misses} misses", [0, 0, 0], 14).print(self.screen, [10, self.height - 15], False)
+            profiler.draw(self.screen, (10, self.height - 25))  # Frame-time graph ([P] - save trace)
 
 
 def close():
     pygame.quit()
-    exit()
\ No newline at end of file
+    exit()
@@ -1,4 +1,5 @@
 import pygame
+import numpy as np
 
 from scripts.UI.text import Text
 
@@ -35,6 +36,55 @@ class Camera:
 
         return global_x, global_y
 
+    def get_local_points(self, global_points: np.ndarray) -> np.ndarray:
+        """
+        This function convert many global points to local coordinates at once
+        :param global_points: Array of global points (..., 2)
+        :return: Array of local points (..., 2)
+        """
+        return (np.asarray(global_points, dtype=np.float64) - (self.x, self.y)) * (self.resolution[0] / self.distance)
+
+    def get_global_points(self, local_points: np.ndarray) -> np.ndarray:
+        """
+        This function convert many local points to global coordinates at once
+        :param local_points: Array of local points (..., 2)
+        :return: Array of global points (..., 2)
+        """
+        return np.asarray(local_points, dtype=np.float64) * (self.distance / self.resolution[0]) + (self.x, self.y)
+
+    def get_viewport(self, screen_size: tuple[int, int] = None) -> tuple:
+        """
+        This function return visible area in global coordinates
+        :param screen_size: Size of the surface (resolution by default)
+        :return: Visible area (left, top, right, bottom)
+        """
+        if screen_size is None:
+            screen_size = self.resolution
+        return self.x, self.y, *self.get_global_point(screen_size[0], screen_size[1])
+
+    def is_rect_visible(self, rect: pygame.Rect, screen_size: tuple[int, int] = None) -> bool:
+        """
+        This function check if global rectangle is (partly) visible
+        :param rect: Rectangle in global coordinates
+        :param screen_size: Size of the surface (resolution by default)
+        :return: True if rectangle is visible
+        """
+        left, top, right, bottom = self.get_viewport(screen_size)
+        return rect.right >= left and rect.left <= right and rect.bottom >= top and rect.top <= bottom
+
+    def get_visible_circles(self, local_points: np.ndarray, local_radius: float, screen_size: tuple[int, int] = None) -> np.ndarray:
+        """
+        This function check which circles are (partly) on the screen
+        :param local_points: Centers in local coordinates (n, 2)
+        :param local_radius: Radius in local coordinates
+        :param screen_size: Size of the surface (resolution by default)
+        :return: Boolean mask (n,)
+        """
+        if screen_size is None:
+            screen_size = self.resolution
+        return (local_points[:, 0] + local_radius >= 0) & (local_points[:, 0] - local_radius <= screen_size[0]) &\
+            (local_points[:, 1] + local_radius >= 0) & (local_points[:, 1] - local_radius <= screen_size[1])
+
     def get_local_radius(self, r: float) -> float:
         """
         This function convert global radius to local radius
@@ -1,17 +1,23 @@
-import socket
+import logging
 import pygame.draw
+import numpy as np
 import random
-import threading
 from scripts.UI.text import Text
 from scripts.map import Map
+from scripts.map_cache import MapCache
+from scripts.network import NetworkClient, NetworkEvent
 from scripts.player import PlayerRole
+from scripts.profiler import profiler
+from scripts.replay import ReplayError, encode_replay, replay_writer
 from scripts.simulation import Simulation
-from scripts.wall import Wall
-from scripts.settings import COUNTDOWN_TIME, ACTION_TIME, SIZE, SERVER_TICK, COLORS
-from scripts.converters import convert_str_movement_into_list
-from server.transfer_messages import send_message, receive_message
+from scripts.settings import COUNTDOWN_TIME, ACTION_TIME, SIZE, SERVER_TICK, COLORS, NETWORK_BUDGET_MS, MAP_CACHE_DIR, REPLAY_PATH
+from server.trajectory import decode_trajectory, encode_trajectory
+from server.transfer_messages import PROTOCOL_VERSION
 from enum import Enum
 
+logger = logging.getLogger("ctt.client")
+
+
 class GameStatus(Enum):
     PREPARING = 1
     COUNTDOWN = 2
@@ -35,16 +41,18 @@ class Field:
         self.server_tick_in_ms = 1000 / SERVER_TICK
         self.count_recorded_ticks = 0
 
-        self.movement_records = []
+        # Position at every server tick of the action (tick k is recorded at k * server_tick_in_ms)
+        self.movement_records = np.zeros((int(ACTION_TIME // self.server_tick_in_ms), 2), dtype=np.float64)
         self.simulation = None
         self.winner = None
+        self.server_result = None  # (winner role, catch time) resolved by the server
 
-        self.sock = None
+        self.network = None  # NetworkClient, its events are applied in update()
+        self.password = ""
         self.server_auth_verified = False
         self.texts = ["...", "...", "...", "..."]
         self.points = [0, 0, 0, 0]
 
-        self.connect_thread = None
         self.prepare_action()
     
     def connect_to_server(self) -> None:
@@ -52,17 +60,13 @@ class Field:
         self.texts = ["...", "...", "...", "..."]
         self.points = [0, 0, 0, 0]
         self.other_players = []
-        if self.sock is not None:
-            self.sock.close()
-            self.sock = None
-        self.connect_thread = threading.Thread(target=self.connect).start()
-
-        self.remember_uuid = ""
+        self.disconnect()
+        self.connect()
 
     def switch_ready_state(self) -> None:
         if self.server_auth_verified and self.game_status == GameStatus.PREPARING:
             self.player.switch_ready_state()
-            send_message(self.sock, "game", "ready", f"{int(self.player.is_ready)}")
+            self.network.send("game", "ready", f"{int(self.player.is_ready)}")
 
     def prepare_action(self) -> None:
         self.game_status = GameStatus.PREPARING
@@ -71,12 +75,14 @@ class Field:
     def start_countdown(self) -> None:
         self.game_status = GameStatus.COUNTDOWN
         self.countdown = COUNTDOWN_TIME
+        self.server_result = None  # The result of the previous round must never be applied to this one
 
     def launch_simulation(self) -> None:
         if self.game_status == GameStatus.AFTER_ACTION:
             names = [self.player.name]
             roles = [self.player.role]
-            movements = [self.movement_records]
+            # The same quantized movement as the server and other clients have
+            movements = [decode_trajectory(encode_trajectory(self.get_recorded_movement()))]
             for player in self.other_players:
                 names.append(player['name'])
                 if player['is_catcher']:
@@ -86,6 +92,8 @@ class Field:
                 movements.append(player['movement'])
 
             self.simulation = Simulation(names, roles, movements, self.map, SERVER_TICK)
+            if self.server_result is not None:
+                self.simulation.set_catch_time(self.server_result[1])
             self.simulation.start()
             self.game_status = GameStatus.SIMULATION
 
@@ -96,141 +104,223 @@ class Field:
         with open('./conf/server.txt', 'r') as file:
             data = file.read().split('\n')
             ip = data[0]
-            port = int(data[1])
-            password = data[2]
+            port = data[1]
+            self.password = data[2]
 
         try:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.connect((ip, int(port)))
-        except ConnectionRefusedError:
-            self.texts[0] = "Connection refused"
-            self.points[0] = 2
-            return
-        except TimeoutError:
-            self.texts[0] = "Connection timeout"
-            self.points[0] = 2
-            return
-        except socket.gaierror:
-            self.texts[0] = "Wrong IP or port"
-            self.points[0] = 2
-            return
+            port = int(port)
         except ValueError:
             self.texts[0] = "Wrong port"
             self.points[0] = 2
             return
-        
-        self.texts[0] = f"Connected ({ip}:{port})"
-        self.points[0] = 3
-        self.texts[1] = "Authenticating..."
-        self.points[1] = 1
+        self.network = NetworkClient(MapCache(MAP_CACHE_DIR))
+        self.network.connect(ip, port)
 
-        send_message(self.sock, "auth", "connect")
-        while True:
-            msgs = receive_message(self.sock, 1024)
-            for msg in msgs:
-                if msg["type"] == "auth":
-                    match msg["action"]:
-                        case "request_password":
-                            send_message(self.sock, "auth", "response_password", password)
-                        case "request_name":
-                            send_message(self.sock, "auth", "response_name", self.player.name)
-                        case "success_password":
-                            self.texts[1] = "Password is correct"
-                            self.points[1] = 3
-                            self.texts[2] = "Name is being checked..."
-                            self.points[2] = 1
-                        case "wrong_password":
-                            self.texts[1] = "Wrong password"
-                            self.points[1] = 2
-                            return
-                        case "field_full":
-                            self.texts[1] = "Field is full"
-                            self.points[1] = 2
-                            return
-                        case "name_taken":
-                            self.texts[2] = "Name is already taken"
-                            self.points[2] = 2
-                            return
-                        case "success_name":
-                            self.texts[2] = f"Name is unique: ({self.player.name})"
-                            self.points[2] = 3
-                            self.texts[3] = "UUID is being provided..."
-                            self.points[3] = 1
-                        case "uuid":
-                            self.player.uuid = msg["parameters"]
-                            self.texts[3] = f"UUID is provided: ({self.player.uuid})"
-                            self.points[3] = 3
-                        case "success":
-                            self.server_auth_verified = True
-                elif msg["type"] == "game":
-                    match msg["action"]:
-                        case "new_player":
-                            data = msg["parameters"].split(" ")
-                            uuid = data[0]
-                            ready = data[1]
-                            is_catcher = data[2]
-                            name = "".join(data[3:])
-                            self.other_players.append({"uuid": uuid, "name": name, "ready": bool(int(ready)), "is_catcher": bool(int(is_catcher))})
-                        case "player_disconnected":
-                            uuid = msg["parameters"]
-                            for i in range(len(self.other_players)):
-                                if self.other_players[i]["uuid"] == uuid:
-                                    self.other_players.pop(i)
-                                    break
-                        case "map":
-                            self.map.load_raw_data(msg["parameters"])
-                        case "switch_ready_status":
-                            players_data = msg['parameters'].split(' ')
-                            for player in self.other_players:
-                                if player['uuid'] == players_data[0]:
-                                    player['ready'] = bool(int(players_data[1]))
-                        case "game_pos":
-                            self.map.set_players(int(msg['parameters']), self.player, change_role=True)
-                        case "start_countdown":
-                            self.start_countdown()
-                        case "other_movement":
-                            values = msg['parameters'].split("!")
-                            for player in self.other_players:
-                                if player['uuid'] == values[0]:
-                                    player['movement'] = convert_str_movement_into_list(values[1])
-                        case "start_simulation":
-                            self.launch_simulation()
-        
+    def disconnect(self) -> None:
+        if self.network is not None:
+            self.network.close()
+            self.network = None
 
-    def update(self, dt: float, mouse_pos: list[float, float]) -> None:
+    def process_network_events(self, budget_in_ms: float = NETWORK_BUDGET_MS) -> None:
+        """
+        This function apply events from the network thread (at least one, the rest while the budget lasts)
+        :param budget_in_ms: Time for applying events in this frame
+        :return: None
+        """
+        if self.network is None:
+            return
+        network_start = profiler.start()
+        deadline = network_start + budget_in_ms * 1_000_000
+        while (event := self.network.get_event()) is not None:
+            self.apply_network_event(event)
+            if self.network is None or profiler.start() >= deadline:
+                break
+        profiler.stop("Network", network_start)
+
+    def apply_network_event(self, event: NetworkEvent) -> None:
+        if event.type == "network":
+            match event.action:
+                case "connected":
+                    ip, port = event.data
+                    self.texts[0] = f"Connected ({ip}:{port})"
+                    self.points[0] = 3
+                    self.texts[1] = "Authenticating..."
+                    self.points[1] = 1
+                    self.network.send("auth", "connect", str(PROTOCOL_VERSION))
+                case "connection_error":
+                    self.texts[0] = event.data
+                    self.points[0] = 2
+                    self.network = None
+                case "disconnected":
+                    self.network = None
+                    self.server_auth_verified = False
+                    self.texts = ["Disconnected from the server", "...", "...", "..."]
+                    self.points = [2, 0, 0, 0]
+        elif event.type == "auth":
+            match event.action:
+                case "request_password":
+                    self.network.send("auth", "response_password", self.password)
+                case "request_name":
+                    self.network.send("auth", "response_name", self.player.name)
+                case "success_password":
+                    self.texts[1] = "Password is correct"
+                    self.points[1] = 3
+                    self.texts[2] = "Name is being checked..."
+                    self.points[2] = 1
+                case "wrong_password":
+                    self.texts[1] = "Wrong password"
+                    self.points[1] = 2
+                    self.disconnect()
+                case "wrong_version":
+                    self.texts[1] = f"Wrong version (server: {event.data}, client: {PROTOCOL_VERSION})"
+                    self.points[1] = 2
+                    self.disconnect()
+                case "field_full":
+                    self.texts[1] = "Field is full"
+                    self.points[1] = 2
+                    self.disconnect()
+                case "name_taken":
+                    self.texts[2] = "Name is already taken"
+                    self.points[2] = 2
+                    self.disconnect()
+                case "success_name":
+                    self.texts[2] = f"Name is unique: ({self.player.name})"
+                    self.points[2] = 3
+                    self.texts[3] = "UUID is being provided..."
+                    self.points[3] = 1
+                case "uuid":
+                    self.player.uuid = event.data
+                    self.texts[3] = f"UUID is provided: ({self.player.uuid})"
+                    self.points[3] = 3
+                case "success":
+                    self.server_auth_verified = True
+        elif event.type == "game":
+            match event.action:
+                case "new_player":
+                    self.other_players.append(event.data)
+                case "player_disconnected":
+                    for i in range(len(self.other_players)):
+                        if self.other_players[i]["uuid"] == event.data:
+                            self.other_players.pop(i)
+                            break
+                case "map":
+                    map_hash, data = event.data
+                    self.map.set_map(data)
+                    self.map.hash = map_hash
+                case "switch_ready_status":
+                    uuid, ready = event.data
+                    for player in self.other_players:
+                        if player['uuid'] == uuid:
+                            player['ready'] = ready
+                case "game_pos":
+                    self.map.set_players(int(event.data), self.player, change_role=True)
+                case "start_countdown":
+                    self.start_countdown()
+                case "other_movement":
+                    uuid, movement = event.data
+                    for player in self.other_players:
+                        if player['uuid'] == uuid:
+                            player['movement'] = movement
+                case "result":
+                    winner, catch_time = event.data
+                    if winner == "catcher":
+                        self.server_result = (PlayerRole.CATCHER, catch_time)
+                    else:
+                        self.server_result = (PlayerRole.RUNNER, None)
+                case "start_simulation":
+                    self.launch_simulation()
+
+    def physics_step(self, step_in_ms: float, mouse_pos: list[float, float], substeps: int = 1) -> None:
+        """
+        This function make one fixed physics step
+        :param step_in_ms: Duration of the step in ms
+        :param mouse_pos: Mouse position in global coordinates
+        :param substeps: Amount of pymunk steps in one step
+        :return: None
+        """
+        self.map.update_physics(self.player.get_pos())
+        self.player.save_previous_pos()
         self.player.update(mouse_pos)
+        for i in range(substeps):
+            if i > 0:
+                self.player.apply_force()
+            self.space.step(step_in_ms / substeps / 1000)
+
+        if self.game_status == GameStatus.ACTION:
+            self.record_ticks(step_in_ms)
+
+    def record_ticks(self, step_in_ms: float) -> None:
+        """
+        This function record positions exactly at server tick boundaries inside the last physics step
+        (interpolation between the positions before and after the step)
+        :param step_in_ms: Duration of the step in ms
+        :return: None
+        """
+        step_start = self.action_time_in_ms
+        self.action_time_in_ms += step_in_ms
+        previous_x, previous_y = self.player.previous_pos
+        x, y = self.player.get_pos()
+
+        while self.count_recorded_ticks < len(self.movement_records) and \
+                self.count_recorded_ticks * self.server_tick_in_ms <= self.action_time_in_ms:
+            progress = (self.count_recorded_ticks * self.server_tick_in_ms - step_start) / step_in_ms
+            progress = min(max(progress, 0), 1)
+            self.movement_records[self.count_recorded_ticks] = (previous_x + (x - previous_x) * progress,
+                                                                previous_y + (y - previous_y) * progress)
+            self.count_recorded_ticks += 1
+
+    def get_recorded_movement(self) -> list[tuple[float, float]]:
+        return [tuple(pos) for pos in self.movement_records[:self.count_recorded_ticks].tolist()]
+
+    def update(self, dt: float, mouse_pos: list[float, float]) -> None:
+        self.process_network_events()
         if self.game_status == GameStatus.COUNTDOWN:
             self.countdown_time_in_ms -= dt
             if self.countdown_time_in_ms <= 0:
                 self.game_status = GameStatus.ACTION
                 self.action_time_in_ms = 0
+                self.count_recorded_ticks = 0
                 self.player.unblock_movement()
         elif self.game_status == GameStatus.ACTION:
-            self.action_time_in_ms += dt
-
-            if self.action_time_in_ms // self.server_tick_in_ms > self.count_recorded_ticks:
-                self.count_recorded_ticks += 1
-                self.movement_records.append(self.player.get_pos())
-
+            # Action time goes forward with physics steps (see record_ticks), not with frames
             if self.action_time_in_ms >= ACTION_TIME:
                 self.game_status = GameStatus.AFTER_ACTION
-                send_message(self.sock, "game", "movement", self.movement_records)
+                if self.network is not None:
+                    self.network.send("game", "movement", encode_trajectory(self.get_recorded_movement()))
                 self.player.block_movement()
         elif self.game_status == GameStatus.SIMULATION:
             self.simulation.update(dt)
+            # The simulation only replays the result (from the server if it is known)
             if self.simulation.get_time() >= ACTION_TIME:
                 self.game_status = GameStatus.RESULTS
                 self.winner = PlayerRole.RUNNER
-                send_message(self.sock, "game", "result", "runner")
             if self.simulation.collision_is_detected:
                 self.game_status = GameStatus.RESULTS
                 self.winner = PlayerRole.CATCHER
-                send_message(self.sock, "game", "result", "catcher")
+            if self.game_status == GameStatus.RESULTS:
+                self.save_replay()
+
+    def save_replay(self) -> None:
+        """
+        This function add the finished round to the replay log on the writer thread (with the result from the server if it is known)
+        """
+        if self.server_result is not None:
+            winner, catch_time = self.server_result
+        else:
+            winner, catch_time = self.winner, self.simulation.catch_time_in_ms
+        try:
+            replay = encode_replay(self.simulation.players_names, self.simulation.is_catcher, self.simulation.trajectories,
+                                   self.simulation.server_ticks_in_ms, "catcher" if winner == PlayerRole.CATCHER else "runner",
+                                   catch_time, self.map.hash)
+        except ReplayError as e:
+            logger.warning("Replay is not saved: %s", e)
+            return
+        replay_writer.save(REPLAY_PATH, replay)
 
-    def draw(self, screen, camera) -> None:
+    def draw(self, screen, camera, alpha: float = 1) -> None:
         if self.game_status != GameStatus.SIMULATION and self.game_status != GameStatus.RESULTS:
             self.map.draw(screen, camera)
-            self.player.draw(screen, camera)
+            self.player.draw(screen, camera, alpha)
         else:
             self.simulation.draw(screen, camera)
 
@@ -0,0 +1,43 @@
+import json
+import pygame
+
+# Commands of the input script and pygame events they produce
+COMMANDS = {
+    "connect": lambda _: [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE)],
+    "ready": lambda _: [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r)],
+    "launch": lambda _: [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_l)],
+    "mouse_down": lambda pos: [pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=pos)],
+    "mouse_up": lambda pos: [pygame.event.Event(pygame.MOUSEBUTTONUP, button=1, pos=pos)],
+    "mouse_pos": lambda pos: [],
+    "quit": lambda _: [pygame.event.Event(pygame.QUIT)],
+}
+
+
+class ScriptedInput:
+    """
+    Input for headless clients. A script is a list of steps [frame, command, argument]
+    (e.g. [0, "connect", null], [120, "ready", null], [300, "mouse_down", [540, 360]]),
+    every step is turned into pygame events on its frame
+    """
+
+    def __init__(self, steps: list) -> None:
+        self.steps = sorted(steps, key=lambda step: step[0])
+        self.next_step = 0
+        self.mouse_pos = (0, 0)
+
+    @staticmethod
+    def load(path: str) -> "ScriptedInput":
+        with open(path, "r") as file:
+            return ScriptedInput(json.load(file))
+
+    def get_events(self, frame: int) -> list[pygame.event.Event]:
+        events = []
+        while self.next_step < len(self.steps) and self.steps[self.next_step][0] <= frame:
+            _, command, argument = self.steps[self.next_step]
+            if command not in COMMANDS:
+                raise ValueError(f"Unknown command of the input script: {command}")
+            if argument is not None and command.startswith("mouse"):
+                self.mouse_pos = tuple(argument)
+            events += COMMANDS[command](self.mouse_pos)
+            self.next_step += 1
+        return events
@@ -1,9 +1,13 @@
 import pygame
+import pymunk
 import json
+import numpy as np
 
+from scripts.camera import Camera
 from scripts.player import Player, PlayerRole
-from scripts.wall import Wall
-from scripts.settings import COLORS, PLAYER_RADIUS
+from scripts.settings import COLORS, PLAYER_RADIUS, WALL_ELASTICITY
+from server.map_format import EXTENSION, get_map_walls, get_walls_bounds, load_compiled_map
+from server.spatial_index import WallGrid
 
 class Map:
 
@@ -11,18 +15,37 @@ class Map:
         self.space = space
 
         self.name = None
+        self.hash = None  # SHA-256 of the map from the server
         self.rounds = None
         self.time = None
         self.size = (0, 0)
-        self.catcher_start_pos = None
-        self.walls = []
-        self.catcher_start_pos = []
-        self.runner_start_pos = []
+        self.walls = np.zeros((0, 4), dtype=np.int32)  # (x, y, width, height) of every wall, map borders first
+        self.walls_bounds = np.zeros((0, 4))  # (left, top, right, bottom) of every wall
+        self.walls_index = WallGrid(self.walls_bounds)  # Spatial index for wall queries
+        self.catcher_start_pos = np.zeros((0, 2))
+        self.runner_start_pos = np.zeros((0, 2))
+
+        # Only walls near the player have pymunk shapes (on the static body of the space)
+        self.shapes = {}  # {index of the wall: pymunk.Poly}
+        self.physics_area = None  # (left, top, right, bottom) where walls have shapes
+        self.physics_margin = 1000  # Half of the size of the area
+
+        # Static geometry is rasterised into an off-screen layer bigger than the screen
+        # and only scrolled while the camera moves inside it
+        self.layer = None
+        self.layer_camera = None  # Camera for which the layer is rasterised
+        self.layer_margin = 0.5  # Extra space around the screen (part of the screen size)
 
     def get_player_amount(self) -> int:
         return len(self.catcher_start_pos) + len(self.runner_start_pos)
 
     def load(self, map_path: str) -> None:
+        if map_path.endswith(EXTENSION):
+            compiled_map = load_compiled_map(map_path)
+            self.set_arrays(compiled_map.name, compiled_map.rounds, compiled_map.time, compiled_map.size,
+                            compiled_map.walls, compiled_map.catcher_start_pos, compiled_map.runner_start_pos)
+            return
+
         with open(map_path, "r") as file:
             data = json.load(file)
             self.set_map(data)
@@ -31,48 +54,141 @@ class Map:
         data = json.loads(raw_data)
         self.set_map(data)
 
-    def set_map(self, data: str) -> None:
-        self.name = data["name"]
-        self.rounds = data["rounds"]
-        self.time = data["time"]
-        self.size = data["map_size"]["width"], data["map_size"]["height"]
-        self.catcher_start_pos = data["catcher_start_pos"]
-        self.runner_start_pos = data["runner_start_pos"]
-
-        walls_pos = data["walls"]
-        self.walls = []
-        # Generate walls for map borders
-        self.walls.append(Wall(pygame.Rect(0, -10, self.size[0], 10)))
-        self.walls[-1].create_rectangle(self.space)
-        self.walls.append(Wall(pygame.Rect(-10, 0, 10, self.size[1])))
-        self.walls[-1].create_rectangle(self.space)
-        self.walls.append(Wall(pygame.Rect(0, self.size[1], self.size[0], 10)))
-        self.walls[-1].create_rectangle(self.space)
-        self.walls.append(Wall(pygame.Rect(self.size[0], 0, 10, self.size[1])))
-        self.walls[-1].create_rectangle(self.space)
-
-        for wall_pos in walls_pos:
-            x = wall_pos["pos"]["x"]
-            y = wall_pos["pos"]["y"]
-            w = wall_pos["size"]["width"]
-            h = wall_pos["size"]["height"]
-            self.walls.append(Wall(pygame.Rect(x, y, w, h)))
-            self.walls[-1].create_rectangle(self.space)
+    def set_map(self, data: dict) -> None:
+        walls = [(wall["pos"]["x"], wall["pos"]["y"], wall["size"]["width"], wall["size"]["height"]) for wall in data["walls"]]
+        self.set_arrays(data["name"], data["rounds"], data["time"], (data["map_size"]["width"], data["map_size"]["height"]), walls,
+                        [(pos["x"], pos["y"]) for pos in data["catcher_start_pos"]],
+                        [(pos["x"], pos["y"]) for pos in data["runner_start_pos"]])
+
+    def set_arrays(self, name: str, rounds: int, time: int, size: tuple[int, int], walls, catcher_start_pos, runner_start_pos) -> None:
+        """
+        This function set the map from arrays (compiled maps are used without copying walls into Python objects)
+        :param name: Name of the map
+        :param rounds: Amount of rounds
+        :param time: Time of the round
+        :param size: Size of the map (width, height)
+        :param walls: Walls (x, y, width, height), shape (n, 4)
+        :param catcher_start_pos: Start positions of catchers (x, y), shape (n, 2)
+        :param runner_start_pos: Start positions of runners (x, y), shape (n, 2)
+        :return: None
+        """
+        self.name = name
+        self.rounds = rounds
+        self.time = time
+        self.size = tuple(size)
+        self.catcher_start_pos = np.asarray(catcher_start_pos, dtype=np.float64).reshape(-1, 2)
+        self.runner_start_pos = np.asarray(runner_start_pos, dtype=np.float64).reshape(-1, 2)
+
+        self.walls = get_map_walls(self.size, walls)
+        self.walls_bounds = get_walls_bounds(self.walls)
+        self.walls_index = WallGrid(self.walls_bounds)
+
+        self.layer = None
+        self.space.remove(*self.shapes.values())
+        self.shapes = {}
+        self.physics_area = None
+
+    def update_physics(self, pos: tuple[float, float]) -> None:
+        """
+        This function create pymunk shapes for walls near the position and remove the far ones
+        (the area is moved only when the position comes close to its border)
+        :param pos: Position of the player
+        :return: None
+        """
+        x, y = pos
+        if self.physics_area is not None:
+            left, top, right, bottom = self.physics_area
+            inner_margin = self.physics_margin / 2
+            if left + inner_margin <= x <= right - inner_margin and top + inner_margin <= y <= bottom - inner_margin:
+                return
+
+        self.physics_area = (x - self.physics_margin, y - self.physics_margin, x + self.physics_margin, y + self.physics_margin)
+        needed = set(self.get_walls_in_rect(self.physics_area).tolist())
+        for index in self.shapes.keys() - needed:
+            self.space.remove(self.shapes.pop(index))
+
+        new_shapes = []
+        for index in needed - self.shapes.keys():
+            left, top, right, bottom = self.walls_bounds[index].tolist()
+            shape = pymunk.Poly(self.space.static_body, [(left, top), (left, bottom), (right, bottom), (right, top)])
+            shape.elasticity = WALL_ELASTICITY
+            self.shapes[index] = shape
+            new_shapes.append(shape)
+        self.space.add(*new_shapes)
 
     def set_players(self, start_id: int, player, change_role=False) -> None:
         # STARTS FROM CATHERS
         if start_id < len(self.catcher_start_pos):
-            player.set_pos(self.catcher_start_pos[start_id]["x"], self.catcher_start_pos[start_id]["y"])
+            player.set_pos(*self.catcher_start_pos[start_id].tolist())
             if change_role:
                 player.role = PlayerRole.CATCHER
         else:
-            player.set_pos(self.runner_start_pos[start_id - len(self.catcher_start_pos)]["x"], self.runner_start_pos[start_id - len(self.catcher_start_pos)]["y"])
+            player.set_pos(*self.runner_start_pos[start_id - len(self.catcher_start_pos)].tolist())
             if change_role:
                 player.role = PlayerRole.RUNNER
 
     def draw(self, screen, camera) -> None:
-        for wall in self.walls:
-            wall.draw(screen, camera)
+        scale = camera.resolution[0] / camera.distance
+        screen_width, screen_height = screen.get_size()
+        if not self.layer_is_valid(camera, scale, screen_width, screen_height):
+            self.rasterise_layer(camera, scale, screen_width, screen_height)
+
+        screen.blit(self.layer, (round((self.layer_camera.x - camera.x) * scale), round((self.layer_camera.y - camera.y) * scale)))
+
+    def layer_is_valid(self, camera, scale: float, screen_width: int, screen_height: int) -> bool:
+        if self.layer is None or self.layer_camera.distance != camera.distance or self.layer_camera.resolution != camera.resolution:
+            return False
+
+        # The visible area must be inside the layer
+        layer_width, layer_height = self.layer.get_size()
+        left = (camera.x - self.layer_camera.x) * scale
+        top = (camera.y - self.layer_camera.y) * scale
+        return left >= 0 and top >= 0 and left + screen_width <= layer_width and top + screen_height <= layer_height
+
+    def rasterise_layer(self, camera, scale: float, screen_width: int, screen_height: int) -> None:
+        margin_x = int(screen_width * self.layer_margin)
+        margin_y = int(screen_height * self.layer_margin)
+        self.layer_camera = Camera(camera.x - margin_x / scale, camera.y - margin_y / scale, camera.distance, camera.resolution)
+        # Opaque layer (with background) is copied much faster than a transparent one
+        self.layer = pygame.Surface((screen_width + 2 * margin_x, screen_height + 2 * margin_y))
+        self.layer.fill(COLORS["background"])
+        self.draw_static(self.layer, self.layer_camera)
+
+    def get_walls_in_rect(self, rect: tuple[float, float, float, float]) -> np.ndarray:
+        """
+        This function find walls which touch the rectangle
+        :param rect: Rectangle (left, top, right, bottom)
+        :return: Indices of walls
+        """
+        return self.walls_index.query_rect(*rect)
+
+    def get_walls_at_point(self, x: float, y: float) -> np.ndarray:
+        """
+        This function find walls which contain the point
+        :param x: X coordinate
+        :param y: Y coordinate
+        :return: Indices of walls
+        """
+        return self.walls_index.query_point(x, y)
+
+    def get_walls_on_segment(self, start: tuple[float, float], end: tuple[float, float]) -> np.ndarray:
+        """
+        This function find walls crossed by the segment
+        :param start: Start of the segment (x, y)
+        :param end: End of the segment (x, y)
+        :return: Indices of walls in the order of crossing
+        """
+        return self.walls_index.query_segment(*start, *end)
+
+    def get_visible_walls(self, camera, screen_size: tuple[int, int] = None) -> np.ndarray:
+        return self.get_walls_in_rect(camera.get_viewport(screen_size))
+
+    def draw_static(self, screen, camera) -> None:
+        visible_bounds = self.walls_bounds[self.get_visible_walls(camera, screen.get_size())]
+        for left, top, right, bottom in camera.get_local_points(visible_bounds.reshape(-1, 2)).reshape(-1, 4).tolist():
+            rect = (left, top, right - left, bottom - top)
+            pygame.draw.rect(screen, COLORS["wall"], rect)
+            pygame.draw.rect(screen, COLORS["wall_contour"], rect, 1)
 
         # Draw borders
         local_pos_lefttop = camera.get_local_point(0, 0)
@@ -81,10 +197,12 @@ class Map:
 
         # Draw start positions
         local_radius = camera.get_local_radius(PLAYER_RADIUS)
-        for runner in self.runner_start_pos:
-            pygame.draw.circle(screen, COLORS["runner"], camera.get_local_point(runner["x"], runner["y"]), local_radius, 2)
-        for catcher in self.catcher_start_pos:
-            pygame.draw.circle(screen, COLORS["catcher"], camera.get_local_point(catcher["x"], catcher["y"]), local_radius, 2)
+        for color, start_pos in ((COLORS["runner"], self.runner_start_pos), (COLORS["catcher"], self.catcher_start_pos)):
+            if not len(start_pos):
+                continue
+            local_points = camera.get_local_points(start_pos)
+            for x, y in local_points[camera.get_visible_circles(local_points, local_radius, screen.get_size())].tolist():
+                pygame.draw.circle(screen, color, (x, y), local_radius, 2)
 
 
 
@@ -0,0 +1,49 @@
+import hashlib
+import os
+
+
+def get_map_hash(raw_data: str | bytes) -> str:
+    if isinstance(raw_data, str):
+        raw_data = raw_data.encode("utf-8")
+    return hashlib.sha256(raw_data).hexdigest()
+
+
+# Class MapCache - maps downloaded from servers, stored on disk by hash of the content
+class MapCache:
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def get_path(self, map_hash: str) -> str:
+        return os.path.join(self.directory, f"{map_hash}.json")
+
+    def get(self, map_hash: str) -> str | None:
+        """
+        This function read a cached map
+        :param map_hash: SHA-256 of the map
+        :return: Raw map data or None (not cached or the file is damaged)
+        """
+        if len(map_hash) != 64 or not all(c in "0123456789abcdef" for c in map_hash):
+            return None  # Not a hash, it is never used as a file name
+        try:
+            with open(self.get_path(map_hash), "rb") as file:
+                raw_data = file.read()
+        except OSError:
+            return None
+        if get_map_hash(raw_data) != map_hash:
+            return None
+        return raw_data.decode("utf-8")
+
+    def put(self, raw_data: str) -> str:
+        """
+        This function save a map (atomically, so the other clients never read a half-written file)
+        :param raw_data: Raw map data
+        :return: Hash of the map
+        """
+        map_hash = get_map_hash(raw_data)
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.get_path(map_hash) + f".{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(raw_data.encode("utf-8"))
+        os.replace(temp_path, self.get_path(map_hash))
+        return map_hash
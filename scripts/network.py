@@ -0,0 +1,198 @@
+import json
+import logging
+import queue
+import selectors
+import socket
+import threading
+import time
+from collections import deque, namedtuple
+
+from scripts.map_cache import MapCache, get_map_hash
+from server.trajectory import TrajectoryError, decode_trajectory
+from server.transfer_messages import ProtocolError, decode_messages, encode_message, logger, _log_message
+
+# Event of the network thread. Type "network" is used for the state of the connection
+# (actions: "connected", "connection_error", "disconnected")
+NetworkEvent = namedtuple("NetworkEvent", ["type", "action", "data"])
+
+
+def parse_message(msg: dict) -> NetworkEvent:
+    """
+    This function do heavy parsing of a message (on the network thread, not in a frame)
+    :param msg: Decoded message
+    :return: Event with parsed data
+    """
+    data = msg["parameters"]
+    if msg["type"] == "game":
+        match msg["action"]:
+            case "map":
+                data = (get_map_hash(data), json.loads(data))
+            case "new_player":
+                values = data.split(" ")
+                data = {"uuid": values[0], "ready": bool(int(values[1])), "is_catcher": bool(int(values[2])), "name": "".join(values[3:])}
+            case "switch_ready_status":
+                values = data.split(" ")
+                data = (values[0], bool(int(values[1])))
+            case "other_movement":
+                uuid, movement = data.split(b"!", 1)
+                try:
+                    data = (uuid.decode("utf-8"), decode_trajectory(movement))
+                except TrajectoryError:
+                    data = (uuid.decode("utf-8"), [])
+            case "result":
+                values = data.split(" ")
+                data = (values[0], float(values[1]) if len(values) > 1 else None)
+    return NetworkEvent(msg["type"], msg["action"], data)
+
+
+# Class NetworkClient - connection to the server on a background thread.
+# Frames are decoded and parsed off-thread and pushed into a thread-safe queue of events,
+# sending only puts an encoded frame into the outbound queue
+class NetworkClient:
+
+    def __init__(self, map_cache: MapCache = None) -> None:
+        self.map_cache = map_cache
+        self.missing_map_hash = None  # Events after the map are held until the map is downloaded
+        self.held_events = []
+        self.events = queue.SimpleQueue()
+        self.outbound = deque()
+        self.sock = None
+        self.thread = None
+        self.is_running = False
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+
+    def connect(self, ip: str, port: int, timeout: float = 5) -> None:
+        self.is_running = True
+        self.thread = threading.Thread(target=self.run, args=(ip, port, timeout), daemon=True)
+        self.thread.start()
+
+    def send(self, mes_type: str, action: str, parameters=None) -> None:
+        self.outbound.append(encode_message(mes_type, action, parameters))
+        self.wakeup()
+        if logger.isEnabledFor(logging.DEBUG):
+            _log_message("SEND", mes_type, action, parameters)
+
+    def close(self) -> None:
+        self.is_running = False
+        self.wakeup()
+
+    def wakeup(self) -> None:
+        try:
+            self.wakeup_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Thread is already woken up or closed
+
+    def get_event(self) -> NetworkEvent | None:
+        try:
+            return self.events.get_nowait()
+        except queue.Empty:
+            return None
+
+    def handle_message(self, msg: dict) -> None:
+        if msg["type"] == "game" and msg["action"] == "map_hash":
+            raw_data = self.map_cache.get(msg["parameters"]) if self.map_cache else None
+            if raw_data is None:
+                self.missing_map_hash = msg["parameters"]
+                self.outbound.append(encode_message("game", "request_map", msg["parameters"]))
+            else:
+                self.events.put(NetworkEvent("game", "map", (msg["parameters"], json.loads(raw_data))))
+            return
+
+        event = parse_message(msg)
+        if msg["type"] == "game" and msg["action"] == "map" and self.missing_map_hash is not None:
+            if event.data[0] != self.missing_map_hash:
+                # The map is still used, but the cache must only keep maps under their own hash
+                logger.warning("Received map doesn't match the requested hash %s, it is not cached", self.missing_map_hash)
+            elif self.map_cache:
+                try:
+                    self.map_cache.put(msg["parameters"])
+                except OSError as e:
+                    logger.warning("Map is not cached: %s", e)
+            self.missing_map_hash = None
+            self.events.put(event)
+            for held_event in self.held_events:
+                self.events.put(held_event)
+            self.held_events = []
+        elif self.missing_map_hash is not None:
+            self.held_events.append(event)
+        else:
+            self.events.put(event)
+
+    def run(self, ip: str, port: int, timeout: float) -> None:
+        try:
+            self.communicate(ip, port, timeout)
+        finally:
+            self.wakeup_reader.close()
+            self.wakeup_writer.close()
+
+    def communicate(self, ip: str, port: int, timeout: float) -> None:
+        try:
+            self.sock = socket.create_connection((ip, port), timeout)
+        except ConnectionRefusedError:
+            self.events.put(NetworkEvent("network", "connection_error", "Connection refused"))
+            return
+        except TimeoutError:
+            self.events.put(NetworkEvent("network", "connection_error", "Connection timeout"))
+            return
+        except socket.gaierror:
+            self.events.put(NetworkEvent("network", "connection_error", "Wrong IP or port"))
+            return
+        except (ValueError, OverflowError):
+            self.events.put(NetworkEvent("network", "connection_error", "Wrong port"))
+            return
+        except OSError as e:
+            self.events.put(NetworkEvent("network", "connection_error", str(e)))
+            return
+
+        self.sock.setblocking(False)
+        self.events.put(NetworkEvent("network", "connected", (ip, port)))
+
+        buffer = bytearray()
+        pending = memoryview(b"")  # Part of a frame which is not sent yet
+        selector = selectors.DefaultSelector()
+        selector.register(self.sock, selectors.EVENT_READ)
+        selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        try:
+            while self.is_running:
+                for key, mask in selector.select():
+                    if key.fileobj is self.wakeup_reader:
+                        while True:
+                            try:
+                                if not self.wakeup_reader.recv(1024):
+                                    break
+                            except BlockingIOError:
+                                break
+                    elif mask & selectors.EVENT_READ:
+                        chunk = self.sock.recv(65536)
+                        if not chunk:
+                            raise ConnectionResetError()
+                        buffer += chunk
+                        for msg in decode_messages(buffer, self.sock):
+                            if logger.isEnabledFor(logging.DEBUG):
+                                _log_message("RECEIVE", msg["type"], msg["action"], msg["parameters"], time.time() - msg["time"])
+                            try:
+                                self.handle_message(msg)
+                            except (ValueError, LookupError, TypeError, AttributeError) as e:
+                                # A malformed message is dropped, the connection stays open
+                                logger.warning("Malformed message %s/%s is dropped: %r", msg["type"], msg["action"], e)
+
+                # Send as much as the socket takes, the rest waits for EVENT_WRITE
+                while pending or self.outbound:
+                    if not pending:
+                        pending = memoryview(self.outbound.popleft())
+                    try:
+                        pending = pending[self.sock.send(pending):]
+                    except BlockingIOError:
+                        break
+                events = selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0)
+                selector.modify(self.sock, events)
+        except (ConnectionError, ProtocolError, OSError):
+            self.events.put(NetworkEvent("network", "disconnected", None))
+        except Exception:
+            # E.g. a frame which can't be decoded, the rest of the stream can't be trusted
+            logger.exception("Connection is closed after an unexpected error")
+            self.events.put(NetworkEvent("network", "disconnected", None))
+        finally:
+            selector.close()
+            self.sock.close()
@@ -23,6 +23,7 @@ class Player:
         self.moment = pymunk.moment_for_circle(PLAYER_MASS, 0, PLAYER_RADIUS)
         self.body = pymunk.Body(PLAYER_MASS, self.moment, pymunk.Body.DYNAMIC)
         self.body.position = pos
+        self.previous_pos = tuple(pos)  # Position before the last physics step (for render interpolation)
         self.shape = pymunk.Circle(self.body, PLAYER_RADIUS)
         self.shape.elasticity = PLAYER_ELASTICITY
 
@@ -37,9 +38,22 @@ class Player:
     
     def set_pos(self, x, y):
         self.body.position = (x, y)
+        self.previous_pos = (x, y)
 
     def get_pos(self):
         return self.body.position.x, self.body.position.y
+
+    def save_previous_pos(self) -> None:
+        self.previous_pos = self.get_pos()
+
+    def get_render_pos(self, alpha: float = 1) -> tuple[float, float]:
+        """
+        This function interpolate position between two last physics states
+        :param alpha: Progress between previous and current state (0..1)
+        :return: Position (x, y)
+        """
+        x, y = self.get_pos()
+        return self.previous_pos[0] + (x - self.previous_pos[0]) * alpha, self.previous_pos[1] + (y - self.previous_pos[1]) * alpha
     
     def add_to_space(self, space: pymunk.Space) -> None:
         space.add(self.body, self.shape)
@@ -63,16 +77,20 @@ class Player:
                 angle = atan2(vector[1], vector[0])
                 # Calculate force
                 self.force = [cos(angle) * PLAYER_SPEED, sin(angle) * PLAYER_SPEED]
-                self.body.apply_force_at_local_point(self.force, (0, 0))
+                self.apply_force()
         else:
+            self.force = [0, 0]
             self.body.velocity = (self.body.velocity[0] * DUMPING, self.body.velocity[1] * DUMPING)
-        
-        self.force = [0, 0]
+
+    def apply_force(self) -> None:
+        # Pymunk resets forces after every step, so the force is applied again on every substep
+        if self.force != [0, 0]:
+            self.body.apply_force_at_local_point(self.force, (0, 0))
             
 
-    def draw(self, screen, camera) -> None:
+    def draw(self, screen, camera, alpha: float = 1) -> None:
         self.body.angular_velocity = 0
-        x, y = camera.get_local_point(self.body.position.x, self.body.position.y)
+        x, y = camera.get_local_point(*self.get_render_pos(alpha))
         r = camera.get_local_radius(PLAYER_RADIUS)
         if self.role == PlayerRole.CATCHER:
             pygame.draw.circle(screen, COLORS['catcher'], (x, y), r)
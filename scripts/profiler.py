@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import pygame
+
+from scripts.UI.text import Text
+
+
+# Class Profiler - keeps timings of the last frames in fixed-size ring buffers
+# (shown as a graph in debug mode and exported as Chrome trace / Perfetto JSON)
+class Profiler:
+    colors = {
+        "Input": (120, 120, 120),
+        "Physics": (50, 113, 252),
+        "Field.update": (0, 190, 190),
+        "Rendering": (255, 150, 0),
+        "Field.draw": (255, 56, 54),
+        "Update": (150, 80, 200),
+        "Network": (0, 160, 0),
+    }
+    # Blocks timed inside other blocks (Field.update and Network inside Physics, Field.draw inside Rendering),
+    # they are not stacked on the graph, otherwise their time is counted twice
+    nested = ("Field.update", "Field.draw", "Network")
+
+    def __init__(self, max_events: int = 20000, max_frames: int = 240) -> None:
+        self.events = deque(maxlen=max_events)  # (name, start in ns, duration in ns, thread id)
+        self.frames = deque(maxlen=max_frames)  # {name: duration in ms} of every frame
+        self.current_frame = {}
+        self.lock = threading.Lock()
+
+    def start(self) -> int:
+        return time.perf_counter_ns()
+
+    def stop(self, name: str, start: int) -> None:
+        """
+        This function save one timed block
+        :param name: Name of the block
+        :param start: Value returned by start()
+        :return: None
+        """
+        duration = time.perf_counter_ns() - start
+        with self.lock:
+            self.events.append((name, start, duration, threading.get_ident()))
+            self.current_frame[name] = self.current_frame.get(name, 0) + duration / 1e6
+
+    def end_frame(self) -> None:
+        with self.lock:
+            self.frames.append(self.current_frame)
+            self.current_frame = {}
+
+    def export_chrome_trace(self, path: str = None) -> str:
+        """
+        This function save events as Chrome trace JSON (chrome://tracing, ui.perfetto.dev)
+        :param path: Path of the file (trace_<time>.json by default)
+        :return: Path of the file
+        """
+        if path is None:
+            path = time.strftime("trace_%Y%m%d_%H%M%S.json")
+        with self.lock:
+            events = list(self.events)
+        trace_events = [{"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": os.getpid(), "tid": tid}
+                        for name, start, duration, tid in events]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+        return path
+
+    def draw(self, screen: pygame.Surface, pos: tuple[int, int], height: int = 100, ms_to_pixels: float = 3) -> None:
+        """
+        This function draw frame-time graph with per-block breakdown (the part of UI)
+        :param screen: Screen for drawing
+        :param pos: Left bottom corner of the graph
+        :param height: Height of the graph
+        :param ms_to_pixels: Pixels for 1 ms
+        :return: None
+        """
+        with self.lock:
+            frames = list(self.frames)
+        x, bottom = pos
+        pygame.draw.rect(screen, (255, 255, 255), (x, bottom - height, len(frames) * 2 if frames else 0, height))
+        # 16.7 ms line (60 FPS)
+        pygame.draw.line(screen, (200, 0, 0), (x, bottom - 16.7 * ms_to_pixels), (x + self.frames.maxlen * 2, bottom - 16.7 * ms_to_pixels))
+
+        totals = {}
+        for i, frame in enumerate(frames):
+            y = bottom
+            for name, color in Profiler.colors.items():
+                duration = frame.get(name, 0)
+                totals[name] = totals.get(name, 0) + duration
+                if name in Profiler.nested:
+                    continue
+                bar = min(duration * ms_to_pixels, y - (bottom - height))
+                if bar > 0:
+                    pygame.draw.rect(screen, color, (x + i * 2, y - bar, 2, bar))
+                    y -= bar
+
+        for i, (name, color) in enumerate(Profiler.colors.items()):
+            average = totals.get(name, 0) / len(frames) if frames else 0
+            Text(f"{name}: {average:.2f} ms", color, 14).print(screen, (x + self.frames.maxlen * 2 + 10, bottom - height + i * 14))
+
+
+profiler = Profiler()
@@ -0,0 +1,259 @@
+"""
+Replay log: finished rounds appended one after another to one binary file + index file (<log>.idx)
+with offsets of the rounds, so any round is found in O(1) and read through mmap without loading the log.
+
+Round: header, names (utf-8, separated by new lines), roles (uint8, 1 - catcher)
+and positions at every tick as float32 (ticks, players, 2), every part is padded to 4 bytes.
+Positions are tick-major, so positions at one moment are next to each other in the file.
+"""
+import atexit
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MAGIC = b"RP"
+VERSION = 1
+# Header: magic, version, winner, amount of players, amount of ticks, tick in ms, catch time in ms (NaN - no catch),
+# time of the round (unix), SHA-256 of the map (zeros - unknown), length of names
+HEADER = struct.Struct("<2sBBIIfdd32sI4x")
+POSITION_DTYPE = np.dtype("<f4")
+OFFSET_DTYPE = np.dtype("<u8")
+WINNERS = {"runner": 0, "catcher": 1}
+
+logger = logging.getLogger("ctt.client")
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def _padding(length: int) -> int:
+    return -length % 4
+
+
+def get_index_path(path: str) -> str:
+    return path + ".idx"
+
+
+@contextmanager
+def _locked(file):
+    """
+    This function lock the file for other processes (e.g. two clients started from one directory)
+    """
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+    try:
+        yield file
+    finally:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Class Replay - one recorded round, positions are a view of the replay log (read only when used)
+class Replay:
+
+    def __init__(self, buffer, offset: int = 0) -> None:
+        if offset + HEADER.size > len(buffer):
+            raise ReplayError("Replay is cut")
+        magic, version, winner, players, ticks, tick_in_ms, catch_time, played_at, map_hash, names_length = HEADER.unpack_from(buffer, offset)
+        if magic != MAGIC:
+            raise ReplayError("It is not a replay")
+        if version != VERSION:
+            raise ReplayError(f"Unsupported version of replay: {version}")
+
+        self.offset = offset
+        self.winner = {value: key for key, value in WINNERS.items()}.get(winner)
+        self.tick_in_ms = tick_in_ms
+        self.catch_time_in_ms = None if np.isnan(catch_time) else catch_time
+        self.played_at = played_at
+        self.map_hash = map_hash.hex() if any(map_hash) else None
+
+        position = offset + HEADER.size
+        self.size = HEADER.size + names_length + _padding(names_length) + players + _padding(players) + ticks * players * 2 * POSITION_DTYPE.itemsize
+        if offset + self.size > len(buffer):
+            raise ReplayError("Replay is cut")
+        self.names = bytes(buffer[position:position + names_length]).decode("utf-8").split("\n") if players else []
+        position += names_length + _padding(names_length)
+        self.is_catcher = np.frombuffer(buffer, np.uint8, players, position).astype(bool)
+        position += players + _padding(players)
+        self.positions = np.frombuffer(buffer, POSITION_DTYPE, ticks * players * 2, position).reshape(ticks, players, 2)
+
+    def get_trajectories(self) -> np.ndarray:
+        """
+        This function return positions in the shape used by Simulation and collision (players, ticks, 2), without copying
+        """
+        return self.positions.transpose(1, 0, 2)
+
+
+def encode_replay(names: list[str], is_catcher: list[bool], trajectories: np.ndarray, tick_in_ms: float,
+                  winner: str | None, catch_time_in_ms: float | None, map_hash: str | None = None, played_at: float = None) -> bytes:
+    """
+    This function convert a round into binary replay
+    :param names: Names of players
+    :param is_catcher: Role of each player
+    :param trajectories: Positions of players (players, ticks, 2)
+    :param tick_in_ms: Time between two ticks in ms
+    :param winner: "catcher", "runner" or None if it is unknown
+    :param catch_time_in_ms: Time of the catch or None
+    :param map_hash: SHA-256 of the map (hex)
+    :param played_at: Time of the round (now by default)
+    :return: Binary replay
+    """
+    if any("\n" in name for name in names):
+        raise ReplayError("Name of a player can't contain a new line")
+    trajectories = np.asarray(trajectories, dtype=np.float64).reshape(len(names), -1, 2)
+    encoded_names = "\n".join(names).encode("utf-8")
+    header = HEADER.pack(MAGIC, VERSION, WINNERS.get(winner, 255), len(names), trajectories.shape[1], tick_in_ms,
+                         np.nan if catch_time_in_ms is None else catch_time_in_ms, time.time() if played_at is None else played_at,
+                         bytes.fromhex(map_hash) if map_hash else bytes(32), len(encoded_names))
+    return b"".join((header, encoded_names, b"\0" * _padding(len(encoded_names)),
+                     np.asarray(is_catcher, dtype=np.uint8).tobytes(), b"\0" * _padding(len(names)),
+                     trajectories.swapaxes(0, 1).astype(POSITION_DTYPE).tobytes()))
+
+
+def append_replay(path: str, replay: bytes) -> int:
+    """
+    This function add a replay to the end of the log and its offset to the index
+    :param path: Path of the replay log
+    :param replay: Binary replay (see encode_replay)
+    :return: Number of the replay in the log
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # The log is locked until the index is written, so replays and offsets of other processes don't interleave
+    with open(path, "ab") as file, _locked(file):
+        offset = file.seek(0, os.SEEK_END)
+        file.write(replay)
+        file.flush()
+        # The index is written after the replay, so it never points to a half-written replay
+        with open(get_index_path(path), "ab") as index_file:
+            index_file.write(np.array([offset], dtype=OFFSET_DTYPE).tobytes())
+            return index_file.tell() // OFFSET_DTYPE.itemsize - 1
+
+
+# Class ReplayWriter - appends replays on a background thread, so the game loop never waits for the lock or the disk
+class ReplayWriter:
+
+    def __init__(self) -> None:
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def save(self, path: str, replay: bytes) -> None:
+        """
+        This function put a replay into the queue of the writer thread (it never waits)
+        :param path: Path of the replay log
+        :param replay: Binary replay (see encode_replay)
+        """
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        self.queue.put((path, replay))
+
+    def run(self) -> None:
+        while (item := self.queue.get()) is not None:
+            path, replay = item
+            try:
+                append_replay(path, replay)
+            except OSError as e:
+                logger.warning("Replay is not saved: %s", e)
+
+    def close(self) -> None:
+        """
+        This function write all queued replays and stop the thread
+        """
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+
+
+replay_writer = ReplayWriter()
+atexit.register(replay_writer.close)  # Queued replays are written before the exit
+
+
+def rebuild_index(path: str) -> np.ndarray:
+    """
+    This function scan the whole log and write the index again (if the index is lost or damaged)
+    :param path: Path of the replay log
+    :return: Offsets of replays
+    """
+    offsets = []
+    with open(path, "rb") as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    offset = 0
+    while offset < len(data):
+        try:
+            replay = Replay(data, offset)
+        except ReplayError:
+            break  # Cut replay at the end of the log
+        offsets.append(offset)
+        offset += replay.size
+    offsets = np.array(offsets, dtype=OFFSET_DTYPE)
+    with open(get_index_path(path), "wb") as file:
+        file.write(offsets.tobytes())
+    return offsets
+
+
+# Class ReplayLog - memory mapped replay log, replays are opened by number in O(1)
+class ReplayLog:
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.buffer = b""
+        self.offsets = np.zeros(0, dtype=OFFSET_DTYPE)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        This function map the log again (to see replays appended after opening)
+        """
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index_path = get_index_path(self.path)
+        index_size = os.path.getsize(index_path) if os.path.exists(index_path) else 0
+        if index_size and index_size % OFFSET_DTYPE.itemsize == 0:
+            with open(index_path, "rb") as file:
+                self.offsets = np.frombuffer(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), OFFSET_DTYPE)
+            # The index is valid if its last replay ends at the end of the log
+            try:
+                if self.offsets[-1] + Replay(self.buffer, int(self.offsets[-1])).size == len(self.buffer):
+                    return
+            except ReplayError:
+                pass
+        self.offsets = rebuild_index(self.path)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, number: int) -> Replay:
+        return Replay(self.buffer, int(self.offsets[number]))
+
+    def __iter__(self):
+        for number in range(len(self)):
+            yield self[number]
@@ -1,6 +1,6 @@
 SIZE = [1080, 720]  # [width, height]
 NAME = "Catch Trought Time (ALPHA 0.0.7)"  # Name of the window
-FPS = 0  # 0 - unlimited
+FPS = 60  # 0 - unlimited (physics runs with fixed PHYSICS_TICK anyway)
 DEBUG = False  # Debug mode
 
 COLORS = {
@@ -21,11 +21,17 @@ PLAYER_FRICTION = 0.5  # Friction of the player
 PLAYER_SPEED = 4000  # Speed of the player
 WALL_ELASTICITY = 0.8  # Elasticity of the wall
 WALL_FRICTION = 0.5  # Friction of the wall
-DUMPING = 0.996  # Dumping of the player
+DUMPING = 0.996  # Dumping of the player (per physics step)
+PHYSICS_TICK = 120  # Physics steps per second
+PHYSICS_SUBSTEPS = 2  # Pymunk steps in one physics step
+MAX_PHYSICS_STEPS = 8  # Max physics steps in one frame (slow frames don't try to catch up forever)
 
 # Action configuration
 COUNTDOWN_TIME = 3000  # Countdown time in ms
 ACTION_TIME = 10000  # Action time in ms
 
 # Server configuration
-SERVER_TICK = 20
\ No newline at end of file
+SERVER_TICK = 20
+MAP_CACHE_DIR = "./cache/maps"  # Maps downloaded from servers (by hash of the content)
+REPLAY_PATH = "./replays/replays.ctr"  # Log of finished rounds
+NETWORK_BUDGET_MS = 2  # Time for applying network events in one frame (at least one event is applied)
\ No newline at end of file
@@ -1,9 +1,13 @@
 import pygame
+import numpy as np
 
 from scripts.UI.text import Text
 from scripts.map import Map
 from scripts.player import PlayerRole
+from scripts.replay import Replay
 from scripts.settings import PLAYER_RADIUS, COLORS
+from server.collision import build_trajectories, find_contacts, find_first_contact
+from server.trajectory import SCALE
 
 class Simulation:
 
@@ -13,12 +17,38 @@ class Simulation:
         self.players_pos = players_pos
         self.map = map
         self.server_ticks_in_ms = 1000 / server_ticks
-        self.current_players_position = [(0, 0) for _ in range(len(players_names))]
+        # (players, ticks, 2), array of a replay is used as it is
+        self.trajectories = players_pos if isinstance(players_pos, np.ndarray) else build_trajectories(players_pos)
+        self.current_players_position = self.get_positions_at(0)
 
         self.simulation_time_in_ms = 0
         self.is_paused = True
         self.collision_is_detected = False
 
+        # The whole match is resolved once (on the first use, if the result is not set),
+        # playback only compares time with the catch time
+        self.is_catcher = [role == PlayerRole.CATCHER for role in players_roles]
+        self._catch_time_in_ms = None
+        self.is_resolved = False
+        self.catches = []  # Every (catcher, runner) pair that touch at the catch time
+
+    @classmethod
+    def from_replay(cls, replay: Replay, map: Map, use_recorded_result: bool = True) -> "Simulation":
+        """
+        This function open a recorded round. Positions stay in the memory mapped replay log
+        and only the ticks around the shown moment are read, so move_to() is O(1).
+        With the recorded result the round is never searched for the catch
+        :param replay: Replay from ReplayLog
+        :param map: Map of the round
+        :param use_recorded_result: Use the catch time from the replay instead of the calculated one
+        :return: Simulation
+        """
+        roles = [PlayerRole.CATCHER if is_catcher else PlayerRole.RUNNER for is_catcher in replay.is_catcher.tolist()]
+        simulation = cls(replay.names, roles, replay.get_trajectories(), map, 1000 / replay.tick_in_ms)
+        if use_recorded_result and replay.winner is not None:
+            simulation.set_catch_time(replay.catch_time_in_ms)
+        return simulation
+
     def start(self) -> None:
         self.is_paused = False
 
@@ -29,32 +59,64 @@ class Simulation:
         self.simulation_time_in_ms = time_in_ms
         self.set_current_positions(self.simulation_time_in_ms)
 
+    def get_positions(self, times_in_ms) -> np.ndarray:
+        """
+        This function calculate positions of all players at many timestamps at once (linear interpolation)
+        :param times_in_ms: Timestamps in ms
+        :return: Array (timestamps, players, 2)
+        """
+        times_in_ms = np.asarray(times_in_ms, dtype=np.float64).reshape(-1)
+        players, ticks = self.trajectories.shape[:2]
+        if ticks < 2:
+            positions = self.trajectories[:, :1] if ticks else np.zeros((players, 1, 2))
+            return np.broadcast_to(positions.swapaxes(0, 1), (len(times_in_ms), players, 2)).copy()
+
+        # After the last tick players stay at their last position
+        tick_times = np.clip(times_in_ms / self.server_ticks_in_ms, 0, ticks - 1)
+        current_ticks = np.minimum(tick_times.astype(np.intp), ticks - 2)
+        progress = (tick_times - current_ticks)[:, None, None]
+
+        start = self.trajectories[:, current_ticks].swapaxes(0, 1)
+        end = self.trajectories[:, current_ticks + 1].swapaxes(0, 1)
+        return start + (end - start) * progress
+
+    def get_positions_at(self, time_in_ms: float) -> np.ndarray:
+        """
+        This function calculate positions of all players at one timestamp
+        :param time_in_ms: Timestamp in ms
+        :return: Array (players, 2)
+        """
+        return self.get_positions(time_in_ms)[0]
+
     def set_current_positions(self, time_in_ms: int) -> None:
-        current_tick = int(time_in_ms // self.server_ticks_in_ms)
-        progress = (time_in_ms % self.server_ticks_in_ms) / self.server_ticks_in_ms
-        # Linear interpolation
-        if current_tick + 1 >= len(self.players_pos[0]):
-            return
-        
-        for i, player_pos in enumerate(self.players_pos):
-            x = player_pos[current_tick][0] + (player_pos[current_tick + 1][0] - player_pos[current_tick][0]) * progress
-            y = player_pos[current_tick][1] + (player_pos[current_tick + 1][1] - player_pos[current_tick][1]) * progress
-            self.current_players_position[i] = (x, y)
+        self.current_players_position = self.get_positions_at(time_in_ms)
 
-    def check_collision_between_catcher_and_runner(self) -> None:
-        for i in range(len(self.current_players_position)):
-            for j in range(len(self.current_players_position)):
-                if i == j:
-                    continue
+    @property
+    def catch_time_in_ms(self) -> float | None:
+        if not self.is_resolved:
+            contact = find_first_contact(self.trajectories, self.is_catcher, PLAYER_RADIUS, self.server_ticks_in_ms)
+            self._catch_time_in_ms = contact[0] if contact else None
+            self.is_resolved = True
+        return self._catch_time_in_ms
 
-                x1, y1 = self.current_players_position[i]
-                x2, y2 = self.current_players_position[j]
+    def set_catch_time(self, catch_time_in_ms: float | None) -> None:
+        """
+        This function replace locally calculated result with the result from the server
+        :param catch_time_in_ms: Time of the catch in ms or None if runners win
+        :return: None
+        """
+        self._catch_time_in_ms = catch_time_in_ms
+        self.is_resolved = True
 
-                if (x1 - x2) ** 2 + (y1 - y2) ** 2 <= 4 * PLAYER_RADIUS ** 2:
-                    if self.players_roles[i] == PlayerRole.RUNNER and self.players_roles[j] == PlayerRole.CATCHER or\
-                        self.players_roles[i] == PlayerRole.CATCHER and self.players_roles[j] == PlayerRole.RUNNER:
-                        self.collision_is_detected = True
-                        return
+    def check_collision_between_catcher_and_runner(self) -> None:
+        if self.catch_time_in_ms is not None and self.simulation_time_in_ms >= self.catch_time_in_ms:
+            self.collision_is_detected = True
+            # Show the exact moment of the catch
+            self.move_to(self.catch_time_in_ms)
+            self.stop()
+            # At the exact catch time distance is equal to the contact distance. The catch time from the server
+            # is calculated from quantized trajectories, so the tolerance is one quantization step
+            self.catches = find_contacts(self.current_players_position, self.is_catcher, PLAYER_RADIUS + 1 / SCALE)
 
     def get_time(self) -> int:
         return self.simulation_time_in_ms
@@ -67,11 +129,14 @@ class Simulation:
 
     def draw(self, screen, camera):
         self.map.draw(screen, camera)
-        for i, player_pos in enumerate(self.current_players_position):
-            x, y = camera.get_local_point(player_pos[0], player_pos[1])
-            r = camera.get_local_radius(PLAYER_RADIUS)
+        local_points = camera.get_local_points(self.current_players_position)
+        r = camera.get_local_radius(PLAYER_RADIUS)
+        for i in np.flatnonzero(camera.get_visible_circles(local_points, r, screen.get_size())):
+            x, y = local_points[i]
             if self.players_roles[i] == PlayerRole.CATCHER:
                 pygame.draw.circle(screen, COLORS['catcher'], (x, y), r)
             else:
                 pygame.draw.circle(screen, COLORS['runner'], (x, y), r)
-            Text(self.players_names[i], (0, 0, 0), 14).print(screen, (x+20, y-40))
\ No newline at end of file
+            if any(i in catch for catch in self.catches):
+                pygame.draw.circle(screen, (0, 0, 0), (x, y), r, 2)
+            Text(self.players_names[i], (0, 0, 0), 14).print(screen, (x+20, y-40))
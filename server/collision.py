@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def build_trajectories(players_pos: list[list[float, float]]) -> np.ndarray:
+    """
+    This function pack movements of all players into one array
+    (shorter movements are padded by their last position)
+    :param players_pos: Movements of players [[(x, y), ...], ...]
+    :return: Array (players, ticks, 2)
+    """
+    ticks = max((len(player_pos) for player_pos in players_pos), default=0)
+    trajectories = np.zeros((len(players_pos), ticks, 2), dtype=np.float64)
+    for i, player_pos in enumerate(players_pos):
+        if len(player_pos):
+            trajectories[i, :len(player_pos)] = player_pos
+            trajectories[i, len(player_pos):] = player_pos[-1]
+    return trajectories
+
+
+def find_first_contact(trajectories: np.ndarray, is_catcher: np.ndarray, radius: float, tick_in_ms: float):
+    """
+    This function find the exact time of the first catch in the whole match.
+    Between two ticks every player moves linearly, so for every catcher/runner pair
+    the distance on a segment is a quadratic function of time and contact is its root
+    :param trajectories: Positions of players (players, ticks, 2)
+    :param is_catcher: Role of each player (players,)
+    :param radius: Radius of a player
+    :param tick_in_ms: Time between two ticks in ms
+    :return: (time in ms, catcher index, runner index) or None if nobody is caught
+    """
+    is_catcher = np.asarray(is_catcher, dtype=bool)
+    catchers = np.flatnonzero(is_catcher)
+    runners = np.flatnonzero(~is_catcher)
+    ticks = trajectories.shape[1]
+    if len(catchers) == 0 or len(runners) == 0 or ticks == 0:
+        return None
+
+    contact_distance_sq = (2 * radius) ** 2
+    # Relative position of every runner to every catcher (catchers, runners, ticks, 2)
+    relative = trajectories[runners][None, :, :, :] - trajectories[catchers][:, None, :, :]
+
+    start = relative[:, :, :-1]
+    shift = relative[:, :, 1:] - start
+    a = np.einsum("...i,...i->...", shift, shift)
+    b = 2 * np.einsum("...i,...i->...", start, shift)
+    c = np.einsum("...i,...i->...", start, start) - contact_distance_sq
+
+    # Progress on the segment (0..1) of the first contact, inf if there is no contact
+    progress = np.full(c.shape, np.inf)
+    progress[c <= 0] = 0  # Already touching at the beginning of the segment
+    discriminant = b * b - 4 * a * c
+    approaching = (c > 0) & (a > 0) & (discriminant >= 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        roots = (-b - np.sqrt(np.where(approaching, discriminant, 0))) / (2 * np.where(approaching, a, 1))
+    hits = approaching & (roots >= 0) & (roots <= 1)
+    progress[hits] = roots[hits]
+
+    times = (np.arange(ticks - 1) + progress) * tick_in_ms
+    if ticks == 1:
+        # Nobody moves, only the start positions can touch
+        times = np.where(np.einsum("...i,...i->...", relative, relative) <= contact_distance_sq, 0.0, np.inf)
+
+    first = np.argmin(times)
+    catcher, runner, _ = np.unravel_index(first, times.shape)
+    if not np.isfinite(times.flat[first]):
+        return None
+    return float(times.flat[first]), int(catchers[catcher]), int(runners[runner])
+
+
+def find_contacts(positions, is_catcher, radius: float) -> list[tuple[int, int]]:
+    """
+    This function find every catcher/runner pair that touch each other at one moment.
+    Runners are put into a uniform grid with cells of the contact distance, so every
+    catcher only checks runners from 9 neighbouring cells
+    :param positions: Positions of players (players, 2)
+    :param is_catcher: Role of each player (players,)
+    :param radius: Radius of a player
+    :return: List of (catcher index, runner index)
+    """
+    cell_size = 2 * radius
+    contact_distance_sq = cell_size ** 2
+    positions = positions.tolist() if isinstance(positions, np.ndarray) else positions
+
+    grid = {}
+    for i, (x, y) in enumerate(positions):
+        if not is_catcher[i]:
+            grid.setdefault((int(x // cell_size), int(y // cell_size)), []).append(i)
+
+    contacts = []
+    for i, (x, y) in enumerate(positions):
+        if not is_catcher[i]:
+            continue
+        cell_x, cell_y = int(x // cell_size), int(y // cell_size)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in grid.get((cell_x + dx, cell_y + dy), ()):
+                    runner_x, runner_y = positions[j]
+                    if (x - runner_x) ** 2 + (y - runner_y) ** 2 <= contact_distance_sq:
+                        contacts.append((i, j))
+    return contacts
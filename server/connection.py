@@ -0,0 +1,71 @@
+import asyncio
+from collections import deque
+
+MAX_QUEUED_BYTES = 1024 * 1024  # High-water mark of the outbound queue, slower clients are dropped
+
+
+# Class Connection - bounded outbound queue of one client drained by its own writer task.
+# Frames are already encoded, so one broadcast frame is shared by all recipients
+class Connection:
+
+    def __init__(self, writer: asyncio.StreamWriter, max_queued_bytes: int = MAX_QUEUED_BYTES) -> None:
+        self.writer = writer
+        self.max_queued_bytes = max_queued_bytes
+        self.frames = deque()
+        self.queued_bytes = 0
+        self.is_closed = False
+        self.is_dropped = False  # Closed because of the high-water mark
+        self.is_counted_as_dropped = False
+        self.has_frames = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    def get_extra_info(self, name: str):
+        return self.writer.get_extra_info(name)
+
+    def enqueue(self, frame: bytes) -> bool:
+        """
+        This function put an encoded frame into the outbound queue (it never waits)
+        :param frame: Encoded message
+        :return: False if the connection is closed or it has been dropped now (more than max_queued_bytes are waiting)
+        """
+        if self.is_closed:
+            return False
+        # Only bytes which are already queued are limited, so one frame bigger than the limit (e.g. a big map)
+        # is accepted when the client reads in time
+        if self.queued_bytes > self.max_queued_bytes:
+            self.is_dropped = True
+            self.close()
+            return False
+        self.frames.append(frame)
+        self.queued_bytes += len(frame)
+        self.has_frames.set()
+        return True
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await self.has_frames.wait()
+                self.has_frames.clear()
+                if self.frames:
+                    frames, self.frames = self.frames, deque()
+                    self.writer.writelines(frames)
+                    await self.writer.drain()
+                    self.queued_bytes -= sum(len(frame) for frame in frames)
+                if self.is_closed:
+                    break
+        except (ConnectionError, OSError):
+            self.is_closed = True
+        finally:
+            self.writer.close()
+
+    def close(self) -> None:
+        """
+        This function close the connection after sending queued frames (dropped connections are aborted at once).
+        The reading coroutine of the client gets DisconnectError
+        """
+        self.is_closed = True
+        self.has_frames.set()
+        if self.is_dropped:
+            self.frames.clear()
+            self.queued_bytes = 0
+            self.writer.transport.abort()  # Don't wait for the data stuck in the socket
@@ -0,0 +1,43 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+
+_listener = None
+
+
+def _stop_listener() -> None:
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()  # Writes all queued records
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def setup_logging(level=logging.INFO, protocol_level=logging.WARNING, stream=None) -> None:
+    """
+    This function send all "ctt" logs through a queue to a background thread,
+    so socket handlers never wait for stdout
+    :param level: Level of "ctt" logs
+    :param protocol_level: Level of per-message protocol logs (DEBUG - log messages)
+    :param stream: Output stream (stderr by default)
+    :return: None
+    """
+    global _listener
+
+    _stop_listener()
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+
+    logger = logging.getLogger("ctt")
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+    logging.getLogger("ctt.protocol").setLevel(protocol_level)
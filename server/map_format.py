@@ -0,0 +1,149 @@
+"""
+Compiled map: header + name + packed little-endian int32 arrays, loaded with mmap without parsing.
+Convert JSON maps (run from the root of the repository):
+    python server/map_format.py server/first_map.json              # -> server/first_map.ctm
+    python server/map_format.py server/first_map.json -o map.ctm
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# Header: magic, version, rounds, time, map width, map height, amount of walls, catchers, runners and name length
+# After the header: name (utf-8, padded to 4 bytes), walls (x, y, width, height), catcher and runner start positions (x, y)
+MAGIC = b"CTMP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHiiiIIIH2x")
+DTYPE = np.dtype("<i4")
+EXTENSION = ".ctm"
+
+CompiledMap = namedtuple("CompiledMap", ["name", "rounds", "time", "size", "walls", "catcher_start_pos", "runner_start_pos"])
+
+
+class MapFormatError(ValueError):
+    pass
+
+
+def _padding(length: int) -> int:
+    return -length % 4
+
+
+def compile_map(data: dict) -> bytes:
+    """
+    This function convert JSON map into compiled map
+    :param data: Map in JSON format (like server/first_map.json)
+    :return: Compiled map
+    """
+    walls = np.array([(wall["pos"]["x"], wall["pos"]["y"], wall["size"]["width"], wall["size"]["height"]) for wall in data["walls"]],
+                     dtype=DTYPE).reshape(-1, 4)
+    catcher_start_pos = np.array([(pos["x"], pos["y"]) for pos in data["catcher_start_pos"]], dtype=DTYPE).reshape(-1, 2)
+    runner_start_pos = np.array([(pos["x"], pos["y"]) for pos in data["runner_start_pos"]], dtype=DTYPE).reshape(-1, 2)
+    name = data["name"].encode("utf-8")
+
+    header = HEADER.pack(MAGIC, VERSION, data["rounds"], data["time"], data["map_size"]["width"], data["map_size"]["height"],
+                         len(walls), len(catcher_start_pos), len(runner_start_pos), len(name))
+    return b"".join((header, name, b"\0" * _padding(len(name)),
+                     walls.tobytes(), catcher_start_pos.tobytes(), runner_start_pos.tobytes()))
+
+
+def decode_compiled_map(buffer) -> CompiledMap:
+    """
+    This function read compiled map without copying (arrays are views of the buffer)
+    :param buffer: bytes, mmap or any other buffer
+    :return: CompiledMap (arrays are read-only)
+    """
+    if len(buffer) < HEADER.size:
+        raise MapFormatError("Compiled map is too short")
+    magic, version, rounds, time, width, height, walls_amount, catchers_amount, runners_amount, name_length = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise MapFormatError("It is not a compiled map")
+    if version != VERSION:
+        raise MapFormatError(f"Unsupported version of compiled map: {version}")
+
+    offset = HEADER.size
+    name = bytes(buffer[offset:offset + name_length]).decode("utf-8")
+    offset += name_length + _padding(name_length)
+    if len(buffer) != offset + (walls_amount * 4 + catchers_amount * 2 + runners_amount * 2) * DTYPE.itemsize:
+        raise MapFormatError("Size of compiled map doesn't match its header")
+
+    arrays = []
+    for amount, columns in ((walls_amount, 4), (catchers_amount, 2), (runners_amount, 2)):
+        arrays.append(np.frombuffer(buffer, DTYPE, amount * columns, offset).reshape(amount, columns))
+        offset += amount * columns * DTYPE.itemsize
+    return CompiledMap(name, rounds, time, (width, height), *arrays)
+
+
+def load_compiled_map(path: str) -> CompiledMap:
+    """
+    This function map compiled map file into memory (pages are read only when arrays are used)
+    :param path: Path of the file
+    :return: CompiledMap
+    """
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return decode_compiled_map(buffer)
+
+
+def compiled_map_to_dict(compiled_map: CompiledMap) -> dict:
+    """
+    This function convert compiled map back into JSON format
+    :param compiled_map: CompiledMap
+    :return: Map in JSON format
+    """
+    return {
+        "name": compiled_map.name,
+        "rounds": compiled_map.rounds,
+        "time": compiled_map.time,
+        "map_size": {"width": compiled_map.size[0], "height": compiled_map.size[1]},
+        "catcher_start_pos": [{"x": x, "y": y} for x, y in compiled_map.catcher_start_pos.tolist()],
+        "runner_start_pos": [{"x": x, "y": y} for x, y in compiled_map.runner_start_pos.tolist()],
+        "walls": [{"pos": {"x": x, "y": y}, "size": {"width": w, "height": h}} for x, y, w, h in compiled_map.walls.tolist()],
+    }
+
+
+def get_map_walls(size: tuple[int, int], walls) -> np.ndarray:
+    """
+    This function add walls of map borders (10 px thick, outside of the map) before the walls of the map
+    :param size: Size of the map (width, height)
+    :param walls: Walls (x, y, width, height), shape (n, 4)
+    :return: All walls (x, y, width, height), shape (n + 4, 4)
+    """
+    width, height = size
+    borders = np.array([(0, -10, width, 10), (-10, 0, 10, height), (0, height, width, 10), (width, 0, 10, height)], dtype=np.int32)
+    return np.concatenate((borders, np.asarray(walls, dtype=np.int32).reshape(-1, 4)))
+
+
+def get_walls_bounds(walls: np.ndarray) -> np.ndarray:
+    """
+    This function convert walls (x, y, width, height) into bounds (left, top, right, bottom)
+    """
+    bounds = np.empty(walls.shape, dtype=np.float64)
+    bounds[:, :2] = walls[:, :2]
+    bounds[:, 2:] = walls[:, :2] + walls[:, 2:]
+    return bounds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile JSON maps into binary maps")
+    parser.add_argument("maps", nargs="+", help="JSON maps")
+    parser.add_argument("-o", "--output", help="path of the compiled map (only for one map)")
+    args = parser.parse_args()
+    if args.output and len(args.maps) > 1:
+        parser.error("--output can be used only with one map")
+
+    for path in args.maps:
+        with open(path, "r") as file:
+            data = json.load(file)
+        output = args.output or os.path.splitext(path)[0] + EXTENSION
+        compiled = compile_map(data)
+        with open(output, "wb") as file:
+            file.write(compiled)
+        print(f"{path} -> {output} ({len(data['walls'])} walls, {len(compiled)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from collision import build_trajectories, find_first_contact
+from spatial_index import WallGrid
+from trajectory import decode_trajectory, encode_trajectory
+from validation import validate_trajectory
+
+WALLS_INDEX = None  # Spatial index of the map in the worker process (see init_worker)
+
+
+def init_worker(walls_bounds) -> None:
+    """
+    This function build the spatial index of the map once in every worker process
+    :param walls_bounds: Walls of the map with borders (left, top, right, bottom)
+    """
+    global WALLS_INDEX
+    WALLS_INDEX = WallGrid(walls_bounds)
+
+
+def check_movement(movement: bytes, start_pos: tuple[float, float], tick_in_ms: float, max_acceleration: float,
+                   max_ticks: int) -> tuple[bytes, dict]:
+    """
+    This function validate a submitted trajectory (runs in a worker process)
+    :param movement: Binary trajectory
+    :param start_pos: Assigned start position of the player
+    :param tick_in_ms: Time between two ticks in ms
+    :param max_acceleration: PLAYER_SPEED / PLAYER_MASS in px/s^2
+    :param max_ticks: Amount of ticks in the round
+    :return: (binary trajectory, the same object if it is valid, report of checks)
+    """
+    try:
+        points = decode_trajectory(movement)
+    except Exception:
+        # Any malformed frame is an empty trajectory, it is clamped to the start position,
+        # so the player still submits a movement and the round can be resolved
+        points = []
+    valid_points, report = validate_trajectory(points, start_pos, WALLS_INDEX, tick_in_ms, max_acceleration, max_ticks)
+    if any(check["violations"] for check in report.values()):
+        return encode_trajectory(valid_points.tolist()), report
+    return movement, report
+
+
+def resolve_match(movements: list[bytes], is_catcher: list[bool], radius: float, tick_in_ms: float) -> tuple[str, float | None]:
+    """
+    This function decide the winner of a round from submitted trajectories (runs in a worker process)
+    :param movements: Binary trajectories of players
+    :param is_catcher: Role of each player
+    :param radius: Radius of a player
+    :param tick_in_ms: Time between two ticks in ms
+    :return: ("catcher", catch time in ms) or ("runner", None)
+    """
+    trajectories = build_trajectories([decode_trajectory(movement) for movement in movements])
+    contact = find_first_contact(trajectories, is_catcher, radius, tick_in_ms)
+    if contact is None:
+        return "runner", None
+    return "catcher", contact[0]
@@ -0,0 +1,96 @@
+import asyncio
+import bisect
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+RESOLVE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Class Metrics - counters, gauges and histograms of the server in Prometheus text format
+class Metrics:
+
+    def __init__(self, prefix: str = "ctt") -> None:
+        self.prefix = prefix
+        self.descriptions = {}  # {name: (type, description)}
+        self.counters = {}  # {(name, labels): value}
+        self.gauges = {}  # {name: function returning the value}
+        self.histograms = {}  # {(name, labels): Histogram}
+
+    def inc(self, name: str, value: float = 1, description: str = "", **labels) -> None:
+        self.descriptions.setdefault(name, ("counter", description))
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, function, description: str = "") -> None:
+        self.descriptions[name] = ("gauge", description)
+        self.gauges[name] = function
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, description: str = "", **labels) -> None:
+        self.descriptions.setdefault(name, ("histogram", description))
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(buckets)
+        self.histograms[key].observe(value)
+
+    @staticmethod
+    def format_labels(labels: tuple, extra: tuple = ()) -> str:
+        labels = labels + extra
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+    def render(self) -> str:
+        lines = []
+        for name, (metric_type, description) in self.descriptions.items():
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {description}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            if metric_type == "counter":
+                for (counter_name, labels), value in self.counters.items():
+                    if counter_name == name:
+                        lines.append(f"{full_name}{self.format_labels(labels)} {value}")
+            elif metric_type == "gauge":
+                lines.append(f"{full_name} {self.gauges[name]()}")
+            else:
+                for (histogram_name, labels), histogram in self.histograms.items():
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{self.format_labels(labels, (('le', bound),))} {cumulative}")
+                    lines.append(f"{full_name}_sum{self.format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{full_name}_count{self.format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    async def handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Any request gets the metrics, headers of the request are skipped
+        try:
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            body = self.render().encode("utf-8")
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("utf-8") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, ip: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_http, ip, port)
+
+
+metrics = Metrics()
@@ -5,4 +5,5 @@ class ServerPlayer:
         self.client = client
         self.is_ready = False
         self.is_catcher = False
-        self.movement = None
\ No newline at end of file
+        self.movement = None
+        self.start_pos = (0, 0)
\ No newline at end of file
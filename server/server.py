@@ -1,67 +1,197 @@
-import os
-import socket
-import threading
+import asyncio
+import hashlib
 import json
-from time import sleep
+import logging
 import uuid
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from player import ServerPlayer
-from transfer_messages import DisconnectError, send_message, receive_message
+from match import check_movement, init_worker, resolve_match
+from metrics import metrics, RESOLVE_BUCKETS
+from logs import setup_logging
+from connection import Connection
+from trajectory import encode_trajectory
+from map_format import EXTENSION as MAP_EXTENSION, compiled_map_to_dict, get_map_walls, get_walls_bounds, load_compiled_map
+from transfer_messages import DisconnectError, PROTOCOL_VERSION, encode_message, receive_message_async, _log_message
+from transfer_messages import logger as logger_protocol
 
 SERVER_IP = 'localhost'
 SERVER_PORT = 19560
 SERVER_PASSWORD = ''
 MAP_PATH = './maps_conf/map.json'
+MAP_RAW_DATA = ''  # Map serialized once at start
+MAP_HASH = ''  # SHA-256 of MAP_RAW_DATA, clients cache maps by it
+MAP_DATA = None
+WALLS_BOUNDS = None  # Walls of the map with borders (left, top, right, bottom), used by validation workers
 MAX_CONNECTIONS = 2
 DATA_SIZE = 1024
+LISTEN_BACKLOG = 1024  # Pending connections queue, big enough for connection storms
 PLAYERS = []
 PLAYER_POS = [i for i in range(MAX_CONNECTIONS)]
 CATCHER_AMOUNT = 1
 RUNNER_AMOUNT = 1
 GAME_COUNT = 0
 WINNERS = []
+PLAYER_RADIUS = 20  # Must be the same as PLAYER_RADIUS in client settings
+SERVER_TICK = 20  # Must be the same as SERVER_TICK in client settings
+PLAYER_SPEED = 4000  # Must be the same as PLAYER_SPEED in client settings
+PLAYER_MASS = 4  # Must be the same as PLAYER_MASS in client settings
+ACTION_TIME = 10000  # Must be the same as ACTION_TIME in client settings
+RESOLVE_POOL = None  # Worker processes for movement validation and match resolution
+ROUND_TASKS = set()  # Running resolve_round tasks (the event loop keeps only weak references to tasks)
+METRICS_IP = '127.0.0.1'
+METRICS_PORT = None  # Port of Prometheus metrics endpoint (None - disabled)
+CONNECTIONS = 0
+MAX_QUEUED_BYTES = 1024 * 1024  # Send queue high-water mark of one client, slower clients are dropped
+LOG_LEVEL = 'INFO'
+PROTOCOL_LOG_LEVEL = 'WARNING'  # DEBUG - log every message
+
+logger = logging.getLogger("ctt.server")
+
+def enqueue(client: Connection, frame: bytes, action: str) -> None:
+    if client.enqueue(frame):
+        metrics.inc("messages_sent_total", description="Sent messages", action=action)
+        metrics.inc("bytes_sent_total", len(frame), description="Sent bytes")
+    elif client.is_dropped and not client.is_counted_as_dropped:
+        client.is_counted_as_dropped = True
+        logger.warning('Connection from %s is dropped: more than %s bytes are queued.', client.get_extra_info("peername"), client.max_queued_bytes)
+        metrics.inc("dropped_connections_total", description="Connections dropped because of a full send queue")
+
+
+def encode(type, action, parameters=None) -> bytes:
+    frame = encode_message(type, action, parameters)
+    if logger_protocol.isEnabledFor(logging.DEBUG):
+        _log_message("SEND", type, action, parameters)
+    return frame
+
+
+def send(client: Connection, type, action, parameters=None) -> None:
+    enqueue(client, encode(type, action, parameters), action)
+
+
+async def receive(reader: asyncio.StreamReader) -> list[dict]:
+    msgs = await receive_message_async(reader)
+    for msg in msgs:
+        metrics.inc("messages_received_total", description="Received messages", action=msg['action'])
+        metrics.inc("bytes_received_total", msg['size'], description="Received bytes")
+        metrics.observe("message_latency_seconds", max(time.time() - msg['time'], 0),
+                        description="One-way delay of received messages", action=msg['action'])
+    return msgs
+
 
 def broadcast_to_all(type, action, parameters=None):
-    global PLAYERS, PLAYER_POS, WINNERS
-    
-    for player in PLAYERS:
-        send_message(player.client, type, action, parameters)
+    global PLAYERS
+
+    frame = encode(type, action, parameters)  # Encoded once for all players
+    for player in list(PLAYERS):
+        enqueue(player.client, frame, action)
 
 
-def broadcast_to_all_except_one(client: socket.socket, type, action, parameters=None):
+def broadcast_to_all_except_one(client: Connection, type, action, parameters=None):
     global PLAYERS
-    
-    for p in PLAYERS:
+
+    frame = encode(type, action, parameters)
+    for p in list(PLAYERS):
         if p.client != client:
-            send_message(p.client, type, action, parameters)
+            enqueue(p.client, frame, action)
+
+
+def create_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(initializer=init_worker, initargs=(WALLS_BOUNDS,))
+
+
+def restart_pool(broken_pool: ProcessPoolExecutor) -> None:
+    """
+    This function replace the broken pool of workers (e.g. a worker was killed), otherwise every next task fails
+    :param broken_pool: The pool which raised BrokenProcessPool (it is replaced only once)
+    """
+    global RESOLVE_POOL
+
+    if RESOLVE_POOL is broken_pool:
+        logger.warning('Process pool is broken, starting a new one.')
+        metrics.inc("pool_restarts_total", description="Restarts of the broken process pool")
+        RESOLVE_POOL = create_pool()
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def resolve_round(players: list[ServerPlayer]) -> None:
+    global WINNERS
+
+    movements = [p.movement for p in players]
+    is_catcher = [p.is_catcher for p in players]
+    loop = asyncio.get_running_loop()
+    resolve_start = time.perf_counter()
+    pool = RESOLVE_POOL
+    try:
+        winner, catch_time = await loop.run_in_executor(pool, resolve_match, movements, is_catcher, PLAYER_RADIUS, 1000 / SERVER_TICK)
+    except Exception as e:
+        # Clients must start the simulation anyway, otherwise they wait for it forever
+        logger.exception('Round can not be resolved')
+        if isinstance(e, BrokenProcessPool):
+            restart_pool(pool)
+        metrics.inc("rounds_total", description="Resolved rounds", winner="error")
+    else:
+        metrics.observe("round_resolve_seconds", time.perf_counter() - resolve_start, RESOLVE_BUCKETS,
+                        description="Time of round resolution in the process pool")
+        metrics.inc("rounds_total", description="Resolved rounds", winner=winner)
+        WINNERS.append(winner)
+        broadcast_to_all("game", "result", f"{winner} {catch_time}" if catch_time is not None else winner)
+    broadcast_to_all("game", "start_simulation")
+
+
+async def validate_movement(player: ServerPlayer, movement: bytes) -> bytes:
+    loop = asyncio.get_running_loop()
+    tick_in_ms = 1000 / SERVER_TICK
+    validation_start = time.perf_counter()
+    pool = RESOLVE_POOL
+    try:
+        movement, report = await loop.run_in_executor(pool, check_movement, movement, player.start_pos, tick_in_ms,
+                                                      PLAYER_SPEED / PLAYER_MASS, int(ACTION_TIME // tick_in_ms))
+    except Exception as e:
+        # The player must still submit a movement, otherwise the round is never resolved
+        logger.exception('Movement of %s can not be validated, the player stays at the start position', player.name)
+        metrics.inc("movement_validation_errors_total", description="Movements replaced by the start position after a validation error")
+        if isinstance(e, BrokenProcessPool):
+            restart_pool(pool)
+        return encode_trajectory([player.start_pos])
+    metrics.observe("movement_validation_seconds", time.perf_counter() - validation_start, RESOLVE_BUCKETS,
+                    description="Time of movement validation in the process pool")
+    for check, result in report.items():
+        metrics.observe("validation_check_seconds", result['seconds'], RESOLVE_BUCKETS, description="Time of one validation check", check=check)
+        metrics.inc("invalid_samples_total", result['violations'], description="Movement samples clamped by validation", check=check)
+    if any(result['violations'] for result in report.values()):
+        logger.warning('Movement of %s is clamped: %s', player.name, {check: result['violations'] for check, result in report.items()})
+    return movement
 
 
-def game(player: ServerPlayer) -> None:
+async def game(player: ServerPlayer, reader: asyncio.StreamReader) -> None:
     global PLAYERS, PLAYER_POS, MAX_CONNECTIONS, DATA_SIZE
 
-    with open(MAP_PATH, 'r') as file:
-        map_data = json.load(file)
-        raw_data = json.dumps(map_data, separators=(',', ':'))
-        send_message(player.client, "game", "map", raw_data)
+    send(player.client, "game", "map_hash", MAP_HASH)  # The client requests the map if it is not in its cache
 
     start_pos = PLAYER_POS[len(PLAYERS)-1]
     if start_pos < CATCHER_AMOUNT:
         player.is_catcher = True
+        pos = MAP_DATA['catcher_start_pos'][start_pos]
     else:
         player.is_catcher = False
-    send_message(player.client, "game", "game_pos", str(start_pos))
+        pos = MAP_DATA['runner_start_pos'][start_pos - CATCHER_AMOUNT]
+    player.start_pos = (pos['x'], pos['y'])
+    send(player.client, "game", "game_pos", str(start_pos))
 
     for p in PLAYERS:
         if p != player:
             # Send to player all other players data
-            send_message(player.client, "game", "new_player", f"{p.uuid} {int(p.is_ready)} {int(p.is_catcher)} {p.name}")
+            send(player.client, "game", "new_player", f"{p.uuid} {int(p.is_ready)} {int(p.is_catcher)} {p.name}")
     # Send to other players this player data
     broadcast_to_all_except_one(player.client, "game", "new_player", f"{player.uuid} {int(player.is_ready)} {int(player.is_catcher)} {player.name}")
     
     while True:
         try:
-            msgs: list[dict] = receive_message(player.client, DATA_SIZE)
+            msgs: list[dict] = await receive(reader)
             for msg in msgs:
                 if msg['type'] == "game":
                     match msg['action']:
@@ -70,81 +200,122 @@ def game(player: ServerPlayer) -> None:
                             player.is_ready = bool(int(msg['parameters']))
                             if all([user.is_ready for user in PLAYERS]) and len(PLAYERS) == MAX_CONNECTIONS:
                                 broadcast_to_all("game", "start_countdown")
+                        case "request_map":
+                            metrics.inc("map_downloads_total", description="Maps sent to clients without the map in the cache")
+                            send(player.client, "game", "map", MAP_RAW_DATA)
                         case "movement":
-                            player.movement = msg["parameters"]
-                            broadcast_to_all_except_one(player.client, "game", "other_movement", f"{player.uuid}!{player.movement}")
+                            if not isinstance(msg["parameters"], bytes):
+                                continue  # Movement must be a binary trajectory
+                            player.movement = await validate_movement(player, msg["parameters"])  # Binary trajectory, clamped if it is invalid
+                            broadcast_to_all_except_one(player.client, "game", "other_movement", player.uuid.encode("utf-8") + b"!" + player.movement)
 
                             if all([user.movement for user in PLAYERS]):
-                                broadcast_to_all("game", "start_simulation")
-                        case "result":
-                            pass
+                                task = asyncio.create_task(resolve_round(list(PLAYERS)))
+                                ROUND_TASKS.add(task)
+                                task.add_done_callback(ROUND_TASKS.discard)
                     
-        except DisconnectError as de:
-            print(f'Connection from {player.client.getpeername()} has been lost.')
+        except DisconnectError:
+            logger.info('Connection from %s has been lost.', player.client.get_extra_info("peername"))
             # Delete player from PLAYERS
-            for i in range(0, len(PLAYERS)):
-                if PLAYERS[i].client == de.sock:
-                    del PLAYERS[i]
-                    break
+            if player in PLAYERS:
+                PLAYERS.remove(player)
             player.client.close()
             broadcast_to_all("game", "player_disconnected", player.uuid)
             break
 
 
-def auth(client: socket.socket) -> None:
+async def auth(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    global CONNECTIONS
+
+    # The map frame can be bigger than the limit, the client still gets MAX_QUEUED_BYTES for other messages while it downloads the map
+    client = Connection(writer, MAX_QUEUED_BYTES + len(MAP_RAW_DATA))
+    logger.info('Connection from %s has been established.', client.get_extra_info("peername"))
     current_player = ServerPlayer()
+    CONNECTIONS += 1
+    metrics.inc("connections_total", description="Accepted connections")
 
     try:
         while True:
-            msgs: list[dict] = receive_message(client, DATA_SIZE)
+            msgs: list[dict] = await receive(reader)
             for msg in msgs:
                 if msg['type'] == "auth":
                     match msg['action']:
                         case "connect":
-                            if len(PLAYERS) >= MAX_CONNECTIONS:
-                                send_message(client, "auth", "field_full")
+                            if msg['parameters'] != str(PROTOCOL_VERSION):
+                                send(client, "auth", "wrong_version", str(PROTOCOL_VERSION))
+                                break
+                            elif len(PLAYERS) >= MAX_CONNECTIONS:
+                                send(client, "auth", "field_full")
                                 break
                             else:
-                                send_message(client, "auth", "request_password")
+                                send(client, "auth", "request_password")
                         case "response_password":
                             if msg['parameters'] == SERVER_PASSWORD:
-                                send_message(client, "auth", "success_password")
-                                send_message(client, "auth", "request_name")
+                                send(client, "auth", "success_password")
+                                send(client, "auth", "request_name")
                             else:
-                                send_message(client, "auth", "wrong_password")
+                                send(client, "auth", "wrong_password")
                                 break
                         case "response_name":
                             name_is_taken = False
                             for i in range(0, len(PLAYERS)):
                                 if PLAYERS[i].name == msg['parameters']:
-                                    send_message(client, "auth", "name_taken")
+                                    send(client, "auth", "name_taken")
                                     name_is_taken = True
                                     break
 
                             if name_is_taken:
                                 break
+
+                            if len(PLAYERS) >= MAX_CONNECTIONS:
+                                # Field could be filled while this player was typing the password
+                                send(client, "auth", "field_full")
+                                break
                             
-                            send_message(client, "auth", "success_name")
+                            send(client, "auth", "success_name")
                             
                             current_player.name = msg['parameters']
                             current_player.uuid = str(uuid.uuid4())
                             current_player.client = client
                             current_player.is_ready = False
-                            send_message(client, "auth", "uuid", current_player.uuid)
+                            send(client, "auth", "uuid", current_player.uuid)
                             PLAYERS.append(current_player)
-                            send_message(client, "auth", "success")
-                            game(current_player)
-                            break
+                            send(client, "auth", "success")
+                            await game(current_player, reader)
+                            return
     except DisconnectError:
-        print(f'Connection from {client.getpeername()} has been lost.')
+        logger.info('Connection from %s has been lost.', client.get_extra_info("peername"))
         client.close()
     except OSError:
-        print(f'Connection has been lost.')
+        logger.info('Connection has been lost.')
         client.close()
+    finally:
+        CONNECTIONS -= 1
+
+
+async def serve() -> None:
+    global RESOLVE_POOL
+
+    server = await asyncio.start_server(auth, SERVER_IP, SERVER_PORT, backlog=LISTEN_BACKLOG)
+
+    logger.info('Server listening on %s:%s...', SERVER_IP, SERVER_PORT)
+
+    if METRICS_PORT:
+        metrics.gauge("connections", lambda: CONNECTIONS, "Open connections")
+        metrics.gauge("lobby_players", lambda: len(PLAYERS), "Authenticated players in the lobby")
+        await metrics.serve(METRICS_IP, METRICS_PORT)
+        logger.info('Metrics on http://%s:%s/metrics', METRICS_IP, METRICS_PORT)
+
+    RESOLVE_POOL = create_pool()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        RESOLVE_POOL.shutdown()
 
 
 def main():
-    global SERVER_IP, SERVER_PORT, SERVER_PASSWORD, MAP_PATH, MAX_CONNECTIONS, PLAYER_POS, CATCHER_AMOUNT, RUNNER_AMOUNT
+    global SERVER_IP, SERVER_PORT, SERVER_PASSWORD, MAP_PATH, MAP_RAW_DATA, MAP_HASH, MAP_DATA, WALLS_BOUNDS, MAX_CONNECTIONS, PLAYER_POS, CATCHER_AMOUNT, RUNNER_AMOUNT, PLAYER_RADIUS, SERVER_TICK, PLAYER_SPEED, PLAYER_MASS, ACTION_TIME, METRICS_PORT, LOG_LEVEL, PROTOCOL_LOG_LEVEL, MAX_QUEUED_BYTES
 
     try:
         with open('server/server_conf.json', 'r') as file:
@@ -153,34 +324,44 @@ def main():
             SERVER_PORT = data['port']
             SERVER_PASSWORD = data['password']
             MAP_PATH = data['map_path']
+            PLAYER_RADIUS = data.get('player_radius', PLAYER_RADIUS)
+            SERVER_TICK = data.get('server_tick', SERVER_TICK)
+            PLAYER_SPEED = data.get('player_speed', PLAYER_SPEED)
+            PLAYER_MASS = data.get('player_mass', PLAYER_MASS)
+            ACTION_TIME = data.get('action_time', ACTION_TIME)
+            METRICS_PORT = data.get('metrics_port', METRICS_PORT)
+            LOG_LEVEL = data.get('log_level', LOG_LEVEL)
+            PROTOCOL_LOG_LEVEL = data.get('protocol_log_level', PROTOCOL_LOG_LEVEL)
+            MAX_QUEUED_BYTES = data.get('max_queued_bytes', MAX_QUEUED_BYTES)
     except FileNotFoundError:
         print('No server_conf.json file found. Please provide values: ip, port, password.')
         SERVER_IP = input('Server IP: ')
         SERVER_PORT = int(input('Server port: '))
         SERVER_PASSWORD = input('Server password: ')
         MAP_PATH = input('Map path: ')
-    
-    with open(MAP_PATH, 'r') as file:
-        map_data = json.load(file)
-        CATCHER_AMOUNT = len(map_data['catcher_start_pos'])
-        RUNNER_AMOUNT = len(map_data['runner_start_pos'])
-        MAX_CONNECTIONS = CATCHER_AMOUNT + RUNNER_AMOUNT
-        
-        PLAYER_POS = [i for i in range(MAX_CONNECTIONS)]
-        random.shuffle(PLAYER_POS)
-    print(f'Max connections: {MAX_CONNECTIONS}')
-
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
-        server_socket.bind((SERVER_IP, SERVER_PORT))
-        server_socket.listen()
-
-        print(f'Server listening on {SERVER_IP}:{SERVER_PORT}...')
 
-        while True:
-            client, address = server_socket.accept()
-            print(f'Connection from {address} has been established.')
+    setup_logging(LOG_LEVEL, PROTOCOL_LOG_LEVEL)
+    
+    if MAP_PATH.endswith(MAP_EXTENSION):
+        map_data = compiled_map_to_dict(load_compiled_map(MAP_PATH))
+    else:
+        with open(MAP_PATH, 'r') as file:
+            map_data = json.load(file)
+    MAP_DATA = map_data
+    MAP_RAW_DATA = json.dumps(map_data, separators=(',', ':'))
+    WALLS_BOUNDS = get_walls_bounds(get_map_walls((map_data['map_size']['width'], map_data['map_size']['height']),
+                                                  [(wall['pos']['x'], wall['pos']['y'], wall['size']['width'], wall['size']['height']) for wall in map_data['walls']]))
+    MAP_HASH = hashlib.sha256(MAP_RAW_DATA.encode('utf-8')).hexdigest()
+    CATCHER_AMOUNT = len(map_data['catcher_start_pos'])
+    RUNNER_AMOUNT = len(map_data['runner_start_pos'])
+    MAX_CONNECTIONS = CATCHER_AMOUNT + RUNNER_AMOUNT
+    
+    PLAYER_POS = [i for i in range(MAX_CONNECTIONS)]
+    random.shuffle(PLAYER_POS)
+    logger.info('Map: %s (%s)', MAP_PATH, MAP_HASH)
+    logger.info('Max connections: %s', MAX_CONNECTIONS)
 
-            threading.Thread(target=auth, args=(client,)).start()
+    asyncio.run(serve())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,152 @@
+import numpy as np
+
+MAX_CELLS = 1 << 20  # Limit of the grid size (very big maps get bigger cells)
+
+
+# Class WallGrid - uniform grid over axis-aligned wall rects.
+# Every cell keeps indices of walls which touch it, cells are stored sorted by their id,
+# so the walls of consecutive cells in one row are one slice of the array
+class WallGrid:
+
+    def __init__(self, bounds: np.ndarray, cell_size: float = None) -> None:
+        """
+        This function build the grid
+        :param bounds: Walls (left, top, right, bottom), shape (n, 4)
+        :param cell_size: Size of a cell (by default about one wall per cell)
+        """
+        self.bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        walls_amount = len(self.bounds)
+        if walls_amount:
+            self.origin = self.bounds[:, :2].min(axis=0)
+            extent = self.bounds[:, 2:].max(axis=0) - self.origin
+        else:
+            self.origin = np.zeros(2)
+            extent = np.ones(2)
+        if cell_size is None:
+            cell_size = max(extent.max() / max(np.sqrt(walls_amount), 1), 1)
+        cell_size = max(cell_size, np.sqrt(extent[0] * extent[1] / MAX_CELLS))
+        self.cell_size = float(cell_size)
+        self.columns, self.rows = (np.floor(extent / self.cell_size).astype(np.int64) + 1).tolist()
+
+        # Cells covered by every wall
+        first = self.get_cells(self.bounds[:, :2])
+        last = self.get_cells(self.bounds[:, 2:])
+        widths = last[:, 0] - first[:, 0] + 1
+        counts = widths * (last[:, 1] - first[:, 1] + 1)
+        walls = np.repeat(np.arange(walls_amount), counts)
+        offsets = np.arange(len(walls)) - np.repeat(np.cumsum(counts) - counts, counts)
+        widths = np.repeat(widths, counts)
+        cells = (np.repeat(first[:, 1], counts) + offsets // widths) * self.columns + np.repeat(first[:, 0], counts) + offsets % widths
+
+        order = np.argsort(cells, kind="stable")
+        self.cell_walls = walls[order]
+        self.cell_start = np.zeros(self.columns * self.rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.columns * self.rows), out=self.cell_start[1:])
+
+    def get_cells(self, points: np.ndarray) -> np.ndarray:
+        cells = np.floor((np.asarray(points, dtype=np.float64) - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, (self.columns - 1, self.rows - 1))
+
+    def get_candidates(self, rows: np.ndarray, first_columns: np.ndarray, last_columns: np.ndarray) -> np.ndarray:
+        """
+        This function collect walls of the ranges of cells (one range in every row)
+        :return: Indices of walls (unsorted, with repeats)
+        """
+        starts = self.cell_start[rows * self.columns + first_columns]
+        ends = self.cell_start[rows * self.columns + last_columns + 1]
+        lengths = ends - starts
+        positions = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self.cell_walls[positions]
+
+    def query_rect(self, left: float, top: float, right: float, bottom: float) -> np.ndarray:
+        """
+        This function find walls which touch the rectangle
+        :return: Sorted indices of walls
+        """
+        if not len(self.bounds) or left > right or top > bottom:
+            return np.zeros(0, dtype=np.int64)
+        (first_column, first_row), (last_column, last_row) = self.get_cells(((left, top), (right, bottom))).tolist()
+        rows = np.arange(first_row, last_row + 1)
+        candidates = np.unique(self.get_candidates(rows, np.full(len(rows), first_column), np.full(len(rows), last_column)))
+        bounds = self.bounds[candidates]
+        return candidates[(bounds[:, 2] >= left) & (bounds[:, 0] <= right) & (bounds[:, 3] >= top) & (bounds[:, 1] <= bottom)]
+
+    def query_point(self, x: float, y: float) -> np.ndarray:
+        """
+        This function find walls which contain the point (border included)
+        :return: Sorted indices of walls
+        """
+        return self.query_rect(x, y, x, y)
+
+    def query_segment(self, x0: float, y0: float, x1: float, y1: float) -> np.ndarray:
+        """
+        This function find walls crossed by the segment
+        :return: Indices of walls in the order of crossing (from (x0, y0))
+        """
+        if not len(self.bounds):
+            return np.zeros(0, dtype=np.int64)
+        # Cells of the segment row by row: in every row the segment covers one range of columns
+        (_, first_row), (_, last_row) = self.get_cells(((x0, min(y0, y1)), (x0, max(y0, y1)))).tolist()
+        rows = np.arange(first_row, last_row + 1)
+        row_tops = np.maximum(self.origin[1] + rows * self.cell_size, min(y0, y1))
+        row_bottoms = np.minimum(self.origin[1] + (rows + 1) * self.cell_size, max(y0, y1))
+        if y0 == y1:
+            xs_top = np.full(len(rows), float(x0))
+            xs_bottom = np.full(len(rows), float(x1))
+        else:
+            xs_top = x0 + (x1 - x0) * (row_tops - y0) / (y1 - y0)
+            xs_bottom = x0 + (x1 - x0) * (row_bottoms - y0) / (y1 - y0)
+        first_columns = self.get_cells(np.column_stack((np.minimum(xs_top, xs_bottom), row_tops)))[:, 0]
+        last_columns = self.get_cells(np.column_stack((np.maximum(xs_top, xs_bottom), row_tops)))[:, 0]
+        candidates = np.unique(self.get_candidates(rows, first_columns, last_columns))
+
+        entry = segment_entry(self.bounds[candidates], (x0, y0), (x1, y1))
+        hits = np.isfinite(entry)
+        return candidates[hits][np.argsort(entry[hits], kind="stable")]
+
+    def segments_hit(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        This function check many segments at once (e.g. the whole trajectory)
+        :param starts: Starts of segments (n, 2)
+        :param ends: Ends of segments (n, 2)
+        :return: True for every segment which crosses (or touches) a wall, shape (n,)
+        """
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        if not len(starts) or not len(self.bounds):
+            return np.zeros(len(starts), dtype=bool)
+        low = np.minimum(starts, ends).min(axis=0)
+        high = np.maximum(starts, ends).max(axis=0)
+        candidates = self.query_rect(low[0], low[1], high[0], high[1])
+        if not len(candidates):
+            return np.zeros(len(starts), dtype=bool)
+        entry = segment_entry(self.bounds[candidates][None, :, :], starts[:, None, :], ends[:, None, :])
+        return np.isfinite(entry).any(axis=1)
+
+
+def segment_entry(bounds: np.ndarray, start, end) -> np.ndarray:
+    """
+    This function find where the segment enters every rect (slab method).
+    Arrays are broadcast, so many segments can be checked against many rects
+    :param bounds: Rects (..., 4) as (left, top, right, bottom)
+    :param start: Start of the segment (..., 2)
+    :param end: End of the segment (..., 2)
+    :return: Progress on the segment (0..1) of the entry for every rect, inf if the segment misses it
+    """
+    bounds = np.asarray(bounds, dtype=np.float64)
+    start = np.asarray(start, dtype=np.float64)
+    direction = np.asarray(end, dtype=np.float64) - start
+    entry = np.zeros(np.broadcast_shapes(bounds.shape[:-1], start.shape[:-1]))
+    leave = np.ones(entry.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for axis in (0, 1):
+            low, high = bounds[..., axis], bounds[..., axis + 2]
+            origin, shift = start[..., axis], direction[..., axis]
+            t1 = (low - origin) / shift
+            t2 = (high - origin) / shift
+            # Segments parallel to the axis are inside the slab either always or never
+            parallel = shift == 0
+            inside = (origin >= low) & (origin <= high)
+            entry = np.maximum(entry, np.where(parallel, np.where(inside, 0, np.inf), np.minimum(t1, t2)))
+            leave = np.minimum(leave, np.where(parallel, np.where(inside, 1, -np.inf), np.maximum(t1, t2)))
+    return np.where(entry <= leave, entry, np.inf)
@@ -0,0 +1,102 @@
+import sys
+import zlib
+import struct
+from array import array
+from itertools import accumulate
+
+# Binary trajectory: header + first point + deltas between ticks
+# Header: magic, flags, scale (units per pixel), amount of points
+MAGIC = b"TR"
+HEADER = struct.Struct("<2sBHI")
+FIRST_POINT = struct.Struct("<ii")
+
+FLAG_ZLIB = 1  # Body is compressed by zlib
+FLAG_WIDE = 2  # Deltas are int32 instead of int16
+
+SCALE = 16  # 1/16 px precision
+MAX_POINTS = 2 ** 16  # Limit of decoded points (a round has ACTION_TIME / tick points), protects from zlib bombs
+INT16_LIMIT = 2 ** 15
+
+
+class TrajectoryError(ValueError):
+    pass
+
+
+def _to_little_endian(values: array) -> array:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def encode_trajectory(points: list[tuple[float, float]], scale: int = SCALE, compress: bool = True) -> bytes:
+    """
+    This function convert list of positions into binary trajectory
+    :param points: Positions [(x, y), ...] recorded every server tick
+    :param scale: Quantization (units per pixel)
+    :param compress: Use zlib for deltas
+    :return: Binary trajectory
+    """
+    flags = 0
+    if not points:
+        return HEADER.pack(MAGIC, flags, scale, 0)
+
+    xs = [round(x * scale) for x, _ in points]
+    ys = [round(y * scale) for _, y in points]
+
+    deltas = array("i", [0]) * (2 * (len(points) - 1))
+    deltas[0::2] = array("i", [b - a for a, b in zip(xs, xs[1:])])
+    deltas[1::2] = array("i", [b - a for a, b in zip(ys, ys[1:])])
+
+    if deltas and (max(deltas) >= INT16_LIMIT or min(deltas) < -INT16_LIMIT):
+        flags |= FLAG_WIDE
+    else:
+        deltas = array("h", deltas)
+    body = _to_little_endian(deltas).tobytes()
+
+    if compress:
+        flags |= FLAG_ZLIB
+        body = zlib.compress(body)
+
+    return HEADER.pack(MAGIC, flags, scale, len(points)) + FIRST_POINT.pack(xs[0], ys[0]) + body
+
+
+def decode_trajectory(data: bytes) -> list[tuple[float, float]]:
+    """
+    This function convert binary trajectory into list of positions
+    :param data: Binary trajectory
+    :return: Positions [(x, y), ...]
+    """
+    if len(data) < HEADER.size:
+        raise TrajectoryError("Trajectory is too short")
+    magic, flags, scale, amount = HEADER.unpack_from(data)
+    if magic != MAGIC or scale == 0:
+        raise TrajectoryError("Wrong trajectory header")
+    if amount == 0:
+        return []
+    if amount > MAX_POINTS:
+        raise TrajectoryError(f"Too many trajectory points: {amount}")
+
+    if len(data) < HEADER.size + FIRST_POINT.size:
+        raise TrajectoryError("Trajectory is too short")
+    x, y = FIRST_POINT.unpack_from(data, HEADER.size)
+    body = data[HEADER.size + FIRST_POINT.size:]
+    deltas = array("i" if flags & FLAG_WIDE else "h")
+    expected_size = 2 * (amount - 1) * deltas.itemsize
+    if flags & FLAG_ZLIB:
+        # The size of deltas is known from the header, nothing bigger is ever decompressed
+        decompressor = zlib.decompressobj()
+        try:
+            body = decompressor.decompress(body, expected_size + 1)
+        except zlib.error as e:
+            raise TrajectoryError(f"Damaged trajectory body: {e}") from e
+        if len(body) > expected_size or decompressor.unconsumed_tail:
+            raise TrajectoryError("Trajectory body is bigger than its header says")
+
+    if len(body) != expected_size:
+        raise TrajectoryError("Wrong amount of trajectory points")
+    deltas.frombytes(body)
+    _to_little_endian(deltas)
+
+    xs = accumulate(deltas[0::2], initial=x)
+    ys = accumulate(deltas[1::2], initial=y)
+    return [(qx / scale, qy / scale) for qx, qy in zip(xs, ys)]
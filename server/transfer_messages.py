@@ -1,80 +1,171 @@
 import time
-from datetime import datetime
+import asyncio
+import logging
+import struct
+import weakref
 
 class DisconnectError(Exception):
     def __init__(self, sock):
         super().__init__(sock)
         self.sock = sock
 
-SEPARATOR = "NEXT"
-END = "END"
-CONTINUE = "CON"
+class ProtocolError(DisconnectError):
+    '''Raised when the peer sends bytes that are not a valid frame (e.g. an old client)'''
+    pass
 
-def receive_message(sock, length=1024, DEBUG=True):
-    global SEPARATOR, END, CONTINUE
+PROTOCOL_VERSION = 3
 
-    try:
-        recv_message = f"{CONTINUE}"
-        while recv_message[-len(CONTINUE):] == CONTINUE:
-            recv_message = recv_message[:-len(CONTINUE)]
-            recv_message += sock.recv(length).decode("utf-8")
-    except ConnectionResetError:
-        raise DisconnectError(sock)
+# Frame: header + type + action + parameters
+# Header: magic, parameters kind, type length, action length, sending time, parameters length
+MAGIC = b"CT"
+HEADER = struct.Struct("!2sBBBdI")
+
+PARAMETERS_NONE = 0
+PARAMETERS_TEXT = 1
+PARAMETERS_BINARY = 2
+
+MAX_PARAMETERS_SIZE = 64 * 1024 * 1024
+
+# Messages are logged at DEBUG level of this logger (off by default, see logs.setup_logging)
+logger = logging.getLogger("ctt.protocol")
+MAX_LOGGED_PARAMETERS = 200  # Longer parameters are truncated in logs
+SAMPLED_ACTIONS = {"movement": 10, "other_movement": 10}  # Log only 1 of N messages of these actions
+_sample_counters = {}
+
+# Every socket keeps its own receive buffer, so bytes of a frame cut by recv() are never lost
+_receive_buffers = weakref.WeakKeyDictionary()
+
+
+def encode_message(mes_type, action, parameters=None, now=None) -> bytes:
+    '''Build one frame. Parameters can be text (str) or raw bytes, any other object is sent as str()'''
+    if now is None:
+        now = time.time()
+
+    if isinstance(parameters, (bytes, bytearray, memoryview)):
+        kind = PARAMETERS_BINARY
+        body = bytes(parameters)
+    elif parameters:
+        kind = PARAMETERS_TEXT
+        body = str(parameters).encode("utf-8")
+    else:
+        kind = PARAMETERS_NONE
+        body = b""
+
+    encoded_type = mes_type.encode("utf-8")
+    encoded_action = action.encode("utf-8")
+    header = HEADER.pack(MAGIC, kind, len(encoded_type), len(encoded_action), now, len(body))
+    return b"".join((header, encoded_type, encoded_action, body))
 
-    for i in range(len(recv_message)-len(CONTINUE)):
-        if recv_message[i:i+len(CONTINUE)] == CONTINUE:
-            recv_message = recv_message[:i] + recv_message[i+len(CONTINUE):]
 
-    messages = recv_message.split(END)[:-1]
+def _parse_header(data, offset=0, sock=None) -> tuple:
+    magic, kind, type_length, action_length, sending_time, parameters_length = HEADER.unpack_from(data, offset)
+    if magic != MAGIC or kind > PARAMETERS_BINARY or parameters_length > MAX_PARAMETERS_SIZE:
+        raise ProtocolError(sock)
+    return kind, type_length, action_length, sending_time, parameters_length
 
+
+def _parse_body(view, kind, type_length, action_length, sending_time) -> dict:
+    mes_type = str(view[:type_length], "utf-8")
+    action = str(view[type_length:type_length + action_length], "utf-8")
+    if kind == PARAMETERS_TEXT:
+        parameters = str(view[type_length + action_length:], "utf-8")
+    elif kind == PARAMETERS_BINARY:
+        parameters = bytes(view[type_length + action_length:])
+    else:
+        parameters = None
+    size = HEADER.size + len(view)
+    return {"time": sending_time, "type": mes_type, "action": action, "parameters": parameters, "size": size}
+
+
+def decode_messages(buffer: bytearray, sock=None) -> list[dict]:
+    '''Cut all complete frames from the beginning of the buffer. Incomplete tail stays in the buffer'''
     messages_dict = []
-    for message in messages:
-        message = message.split(SEPARATOR)
-        sending_time = message[0]
-        mes_type = message[1]
-        action = message[2]
-        parameters = ''.join(message[3:]) if len(message) > 3 else None
-
-        if DEBUG:
-            reading_time = datetime.utcfromtimestamp(float(sending_time)).strftime('%Y-%m-%d %H:%M:%S.%f')[:-2]
-            diff = round(time.time() - float(sending_time), 4)
-            if parameters:
-                print(f"RECEIVE [{reading_time}] ({diff}). Type: {mes_type}, action: {action}, parameters: {parameters}")
-            else:
-                print(f"RECEIVE [{reading_time}] ({diff}). Type: {message[1]}, action: {message[2]}")
-
-        messages_dict.append({"time": sending_time, "type": mes_type, "action": action, "parameters": parameters})
-    
+    offset = 0
+    with memoryview(buffer) as view:
+        while len(view) - offset >= HEADER.size:
+            kind, type_length, action_length, sending_time, parameters_length = _parse_header(view, offset, sock)
+
+            start = offset + HEADER.size
+            end = start + type_length + action_length + parameters_length
+            if end > len(view):
+                break
+
+            messages_dict.append(_parse_body(view[start:end], kind, type_length, action_length, sending_time))
+            offset = end
+
+    del buffer[:offset]
     return messages_dict
 
-def send_message(sock, mes_type, action, parameters=None, length=1024, DEBUG=True):
-    '''ATTENSION: Don't use syntax words like "CON", "NEXT" or "END" in messages'''
-    global SEPARATOR, END, CONTINUE
 
-    now = time.time()
-    if parameters:
-        message = f"{now}{SEPARATOR}{mes_type}{SEPARATOR}{action}{SEPARATOR}{parameters}{END}"
+def _format_parameters(parameters) -> str:
+    if isinstance(parameters, (bytes, bytearray)):
+        return f"<{len(parameters)} bytes>"
+    if parameters and len(parameters) > MAX_LOGGED_PARAMETERS:
+        return f"{parameters[:MAX_LOGGED_PARAMETERS]}... ({len(parameters)} chars)"
+    return str(parameters)
+
+
+def _log_message(direction, mes_type, action, parameters, delay=None) -> None:
+    '''Log one message (only called when DEBUG level is enabled). Frequent actions are sampled'''
+    sampling = SAMPLED_ACTIONS.get(action)
+    if sampling:
+        _sample_counters[action] = _sample_counters.get(action, 0) + 1
+        if (_sample_counters[action] - 1) % sampling:
+            return
+    if delay is None:
+        logger.debug("%s type=%s action=%s parameters=%s", direction, mes_type, action, _format_parameters(parameters))
     else:
-        message = f"{now}{SEPARATOR}{mes_type}{SEPARATOR}{action}{SEPARATOR}{END}"
+        logger.debug("%s type=%s action=%s delay=%.4f parameters=%s", direction, mes_type, action, delay, _format_parameters(parameters))
 
-    chunks_amount = (len(message)-1) // (length-len(CONTINUE))
 
+def receive_message(sock, length=1024, DEBUG=True):
+    '''Wait until at least one complete message arrives and return all complete messages'''
+    buffer = _receive_buffers.get(sock)
+    if buffer is None:
+        buffer = _receive_buffers[sock] = bytearray()
+
+    messages_dict = decode_messages(buffer, sock)
+    while not messages_dict:
+        try:
+            chunk = sock.recv(length)
+        except (ConnectionResetError, ConnectionAbortedError):
+            raise DisconnectError(sock)
+        if not chunk:
+            raise DisconnectError(sock)
+        buffer += chunk
+        messages_dict = decode_messages(buffer, sock)
+
+    if DEBUG and logger.isEnabledFor(logging.DEBUG):
+        for message in messages_dict:
+            _log_message("RECEIVE", message["type"], message["action"], message["parameters"], time.time() - message["time"])
+
+    return messages_dict
+
+def send_message(sock, mes_type, action, parameters=None, DEBUG=True):
+    now = time.time()
+    message = encode_message(mes_type, action, parameters, now)
+
+    try:
+        sock.sendall(message)
+    except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
+        raise DisconnectError(sock)
+
+    if DEBUG and logger.isEnabledFor(logging.DEBUG):
+        _log_message("SEND", mes_type, action, parameters)
+
+
+# --- asyncio streams (server side) ---
+async def receive_message_async(reader, DEBUG=True):
+    '''Read one complete message from asyncio.StreamReader. Returns a list to keep the shape of receive_message'''
     try:
-        for i in range(chunks_amount):
-            start_idx = i*length-i*len(CONTINUE)
-            end_idx = i*length-i-len(CONTINUE)+length-i*(len(CONTINUE)-1)
-
-            chunk_message = f"{message[start_idx:end_idx]}{CONTINUE}"
-            sock.send(chunk_message.encode('utf-8'))
-
-        last_chunk_message = f"{message[chunks_amount*length-chunks_amount*len(CONTINUE):]}"
-        sock.send(last_chunk_message.encode('utf-8'))
-    except ConnectionResetError:
-        DisconnectError(sock)
-
-    if DEBUG:
-        reading_time = datetime.utcfromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S.%f')[:-2]
-        if parameters:
-            print(f"SEND [{reading_time}]. Type: {mes_type}, action: {action}, parameters: {parameters}")
-        else:
-            print(f"SEND [{reading_time}]. Type: {mes_type}, action: {action}")
\ No newline at end of file
+        header = await reader.readexactly(HEADER.size)
+        kind, type_length, action_length, sending_time, parameters_length = _parse_header(header, 0, reader)
+        body = await reader.readexactly(type_length + action_length + parameters_length)
+    except (asyncio.IncompleteReadError, ConnectionResetError, ConnectionAbortedError):
+        raise DisconnectError(reader)
+
+    message = _parse_body(memoryview(body), kind, type_length, action_length, sending_time)
+    if DEBUG and logger.isEnabledFor(logging.DEBUG):
+        _log_message("RECEIVE", message["type"], message["action"], message["parameters"], time.time() - message["time"])
+
+    return [message]
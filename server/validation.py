@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+
+CHECKS = ("length", "start", "speed", "walls")
+
+START_TOLERANCE = 1  # px, the client records the start position with 1/16 px precision
+SPEED_TOLERANCE = 0.05  # Part of the max step (physics steps are discrete)
+STEP_TOLERANCE = 1  # px, added to every max step
+
+
+def get_max_steps(ticks: int, tick_in_ms: float, max_acceleration: float) -> np.ndarray:
+    """
+    This function find the longest possible move between two ticks.
+    The player starts from rest and can't accelerate faster than max_acceleration
+    (damping and bounces only slow the player down), so after t seconds the speed is at most a * t
+    and the distance between ticks k and k + 1 is at most a * (t[k + 1]^2 - t[k]^2) / 2
+    :param ticks: Amount of ticks
+    :param tick_in_ms: Time between two ticks in ms
+    :param max_acceleration: PLAYER_SPEED / PLAYER_MASS in px/s^2
+    :return: Max distance of every step, shape (ticks - 1,)
+    """
+    times = np.arange(ticks) * tick_in_ms / 1000
+    return max_acceleration * np.diff(times * times) / 2 * (1 + SPEED_TOLERANCE) + STEP_TOLERANCE
+
+
+def validate_trajectory(points, start_pos: tuple[float, float], walls_index, tick_in_ms: float, max_acceleration: float,
+                        max_ticks: int) -> tuple[np.ndarray, dict]:
+    """
+    This function check the trajectory against the map and physics limits and clamp invalid samples:
+    extra ticks are cut, the first tick is moved to the start position, too long steps are shortened
+    and steps through walls are replaced by standing still
+    :param points: Positions at every tick (ticks, 2)
+    :param start_pos: Assigned start position (x, y)
+    :param walls_index: WallGrid of the map (with borders)
+    :param tick_in_ms: Time between two ticks in ms
+    :param max_acceleration: PLAYER_SPEED / PLAYER_MASS in px/s^2
+    :param max_ticks: Amount of ticks in the round
+    :return: (valid positions, {check: {"violations": amount of invalid samples, "seconds": time of the check}})
+    """
+    report = {}
+    points = np.array(points, dtype=np.float64).reshape(-1, 2)
+
+    check_start = time.perf_counter()
+    violations = max(len(points) - max_ticks, 0)
+    points = points[:max_ticks]
+    report["length"] = {"violations": violations, "seconds": time.perf_counter() - check_start}
+
+    check_start = time.perf_counter()
+    violations = 0
+    if not len(points):
+        points = np.array([start_pos], dtype=np.float64)
+        violations = 1
+    elif np.hypot(*(points[0] - start_pos)) > START_TOLERANCE:
+        points[0] = start_pos
+        violations = 1
+    report["start"] = {"violations": violations, "seconds": time.perf_counter() - check_start}
+
+    check_start = time.perf_counter()
+    max_steps = get_max_steps(len(points), tick_in_ms, max_acceleration)
+    too_long = np.hypot(*np.diff(points, axis=0).T) > max_steps
+    report["speed"] = {"violations": int(too_long.sum()), "seconds": time.perf_counter() - check_start}
+
+    check_start = time.perf_counter()
+    through_walls = walls_index.segments_hit(points[:-1], points[1:])
+    report["walls"] = {"violations": int(through_walls.sum()), "seconds": time.perf_counter() - check_start}
+
+    if too_long.any() or through_walls.any():
+        # Every clamped sample changes the next steps, so they are checked one by one from the first invalid one
+        check_start = time.perf_counter()
+        original = points.copy()
+        first = int(np.flatnonzero(too_long | through_walls)[0])
+        for tick in range(first, len(points) - 1):
+            step = points[tick + 1] - points[tick]
+            length = np.hypot(*step)
+            if length > max_steps[tick]:
+                points[tick + 1] = points[tick] + step * (max_steps[tick] / length)
+            if walls_index.query_segment(*points[tick], *points[tick + 1]).size:
+                points[tick + 1] = points[tick]
+        changed = np.any(points != original, axis=1)
+        report["clamp"] = {"violations": int(changed.sum()), "seconds": time.perf_counter() - check_start}
+
+    return points, report
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from scripts.analytics import COLUMNS, analyze, summarize
+from scripts.replay import append_replay, encode_replay
+from scripts.settings import PLAYER_RADIUS
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "replays.ctr")
+        ticks = np.arange(200, dtype=np.float64)
+        # The catcher runs at the standing runner, contact distance is reached at x = 500 - 2 * radius
+        catch = np.stack((np.column_stack((ticks * 10, np.full(200, 100.0))), np.tile((500.0, 100.0), (200, 1))))
+        # Both players run in parallel 300 px apart
+        escape = np.stack((np.column_stack((ticks, np.full(200, 100.0))), np.column_stack((ticks, np.full(200, 400.0)))))
+        append_replay(self.path, encode_replay(["c", "r"], [True, False], catch, 50, "catcher", 1000, "ab" * 32))
+        append_replay(self.path, encode_replay(["c", "r"], [True, False], escape, 50, "catcher", 500, "ab" * 32))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_analyze(self):
+        rows, heatmaps = analyze([self.path], {"ab" * 32: (1000, 1000)}, workers=1, cell_size=100)
+        rows = [dict(zip(COLUMNS, row)) for row in rows]
+        self.assertEqual([row["computed_winner"] for row in rows], ["catcher", "runner"])
+
+        catch_time = (500 - 2 * PLAYER_RADIUS) / 10 * 50
+        self.assertAlmostEqual(rows[0]["computed_catch_time_in_ms"], catch_time)
+        self.assertAlmostEqual(rows[0]["catcher_distance"], 500 - 2 * PLAYER_RADIUS)
+        self.assertAlmostEqual(rows[0]["runner_distance"], 0)
+        self.assertAlmostEqual(rows[0]["closest_approach"], 2 * PLAYER_RADIUS)
+        self.assertAlmostEqual(rows[1]["catcher_distance"], 199)
+        self.assertAlmostEqual(rows[1]["closest_approach"], 300)
+
+        catchers, runners = heatmaps["ab" * 32]
+        self.assertEqual(catchers.shape, (10, 10))
+        # Runners stand at (500, 100) until the catch and run at y = 400 for the whole second round
+        self.assertEqual(runners[5, 1], len(np.arange(200)[np.arange(200) * 50 < catch_time]) + 1)
+        self.assertEqual(runners[:, 4].sum(), 200)
+
+        summary = summarize([tuple(row.values()) for row in rows])["ab" * 32]
+        self.assertEqual((summary["rounds"], summary["catcher_wins"], summary["mismatches"]), (2, 0.5, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
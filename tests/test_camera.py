@@ -0,0 +1,27 @@
+import unittest
+
+import pygame
+
+from scripts.camera import Camera
+
+
+class TestCamera(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.camera = Camera(x=100, y=50, distance=500, resolution=(1000, 800))
+
+    def test_batched_transforms_match_single_point(self):
+        points = [(100, 50), (350, 450), (-20, 7.5)]
+        local_points = self.camera.get_local_points(points)
+        for point, local_point in zip(points, local_points.tolist()):
+            self.assertEqual(tuple(local_point), self.camera.get_local_point(*point))
+        self.assertEqual(self.camera.get_global_points(local_points).tolist(), [list(p) for p in points])
+
+    def test_viewport(self):
+        self.assertEqual(self.camera.get_viewport(), (100, 50, 600, 450))
+        self.assertTrue(self.camera.is_rect_visible(pygame.Rect(590, 440, 100, 100)))
+        self.assertFalse(self.camera.is_rect_visible(pygame.Rect(0, 0, 50, 50)))
+
+
+if __name__ == "__main__":
+    unittest.main()
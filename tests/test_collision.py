@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from server.collision import find_contacts, find_first_contact
+
+
+class TestContinuousCollision(unittest.TestCase):
+
+    def test_fast_pass_between_ticks(self):
+        # Runner flies through the catcher between two ticks, no tick is closer than 100
+        trajectories = np.array([[(0, 0), (0, 0)], [(-100, 0), (100, 0)]], dtype=float)
+        contact = find_first_contact(trajectories, [True, False], 20, 50)
+        self.assertIsNotNone(contact)
+        self.assertAlmostEqual(contact[0], 15.0)  # Distance 40 after 60 of 200 units
+        self.assertEqual(contact[1:], (0, 1))
+
+    def test_no_contact(self):
+        trajectories = np.array([[(0, 0), (0, 0)], [(-100, 100), (100, 100)]], dtype=float)
+        self.assertIsNone(find_first_contact(trajectories, [True, False], 20, 50))
+
+    def test_same_role_is_ignored(self):
+        trajectories = np.array([[(0, 0)], [(0, 0)], [(500, 500)]], dtype=float)
+        self.assertIsNone(find_first_contact(trajectories, [False, False, True], 20, 50))
+
+    def test_touching_at_start(self):
+        trajectories = np.array([[(0, 0)], [(30, 0)]], dtype=float)
+        self.assertEqual(find_first_contact(trajectories, [True, False], 20, 50), (0.0, 0, 1))
+
+    def test_earliest_of_many(self):
+        trajectories = np.array([[(0, 0), (0, 0), (0, 0)],
+                                 [(1000, 0), (1000, 0), (1000, 0)],
+                                 [(200, 0), (200, 0), (0, 0)],
+                                 [(1200, 0), (1100, 0), (1000, 0)]], dtype=float)
+        contact = find_first_contact(trajectories, [True, True, False, False], 20, 50)
+        self.assertAlmostEqual(contact[0], 50 + 50 * 60 / 100)
+        self.assertEqual(contact[1:], (1, 3))
+
+
+class TestBroadphase(unittest.TestCase):
+
+    def test_every_catch_is_reported(self):
+        positions = np.array([(0, 0), (35, 0), (-35, 0), (1000, 1000), (1000, 1039), (30, 30), (1000, 1100)], dtype=float)
+        is_catcher = [True, False, False, True, False, True, False]
+        self.assertEqual(sorted(find_contacts(positions, is_catcher, 20)), [(0, 1), (0, 2), (3, 4), (5, 1)])
+
+    def test_same_role_is_ignored(self):
+        self.assertEqual(find_contacts([(0, 0), (10, 0)], [False, False], 20), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+
+from server.connection import Connection
+from server.transfer_messages import encode_message, receive_message_async
+
+
+class TestConnection(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.writers = []
+        self.server = await asyncio.start_server(lambda reader, writer: self.writers.append(writer), "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.clients = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+        self.readers = [reader for reader, _ in self.clients]
+        while len(self.writers) < 2:
+            await asyncio.sleep(0)
+
+    async def asyncTearDown(self) -> None:
+        for _, writer in self.clients:
+            writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_one_frame_for_all_clients(self):
+        connections = [Connection(writer) for writer in self.writers]
+        frame = encode_message("game", "start_countdown")
+        for connection in connections:
+            self.assertTrue(connection.enqueue(frame))
+        for reader in self.readers:
+            msg = (await receive_message_async(reader, DEBUG=False))[0]
+            self.assertEqual(msg["action"], "start_countdown")
+        for connection in connections:
+            connection.close()
+
+    async def test_slow_client_is_dropped(self):
+        connection = Connection(self.writers[0], max_queued_bytes=1000)
+        self.assertTrue(connection.enqueue(b"x" * 600))
+        self.assertTrue(connection.enqueue(b"x" * 600))
+        self.assertFalse(connection.enqueue(b"x" * 600))  # Nothing is sent yet, the writer task hasn't run
+        self.assertTrue(connection.is_dropped)
+        self.assertFalse(connection.enqueue(b"x"))
+        self.assertEqual(await self.readers[0].read(), b"")
+
+
+    async def test_frame_bigger_than_limit(self):
+        connection = Connection(self.writers[0], max_queued_bytes=1000)
+        frame = encode_message("game", "map", "x" * 5000)
+        self.assertTrue(connection.enqueue(frame))
+        self.assertFalse(connection.is_dropped)
+        msg = (await receive_message_async(self.readers[0], DEBUG=False))[0]
+        self.assertEqual(msg["parameters"], "x" * 5000)
+        connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
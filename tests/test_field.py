@@ -0,0 +1,47 @@
+import unittest
+
+import pymunk
+
+from scripts.field import Field, GameStatus
+from scripts.network import NetworkEvent
+from scripts.player import Player, PlayerRole
+from scripts.settings import ACTION_TIME, SERVER_TICK
+
+
+class TestMovementRecording(unittest.TestCase):
+
+    def record(self, step_in_ms: float) -> list:
+        space = pymunk.Space()
+        player = Player("1", "player", PlayerRole.RUNNER, (100, 100))
+        player.add_to_space(space)
+        field = Field(space, player)
+        field.game_status = GameStatus.ACTION
+        while field.action_time_in_ms < ACTION_TIME:
+            # Moves 1 unit per ms during the step
+            player.set_pos(100 + field.action_time_in_ms, 100)
+            player.body.position = (100 + field.action_time_in_ms + step_in_ms, 100)
+            field.record_ticks(step_in_ms)
+        return field.get_recorded_movement()
+
+    def test_ticks_do_not_depend_on_step(self):
+        tick_in_ms = 1000 / SERVER_TICK
+        for step_in_ms in (1000 / 120, 1000 / 7, 130):
+            movement = self.record(step_in_ms)
+            self.assertEqual(len(movement), ACTION_TIME // tick_in_ms)
+            for tick, (x, y) in enumerate(movement):
+                self.assertAlmostEqual(x, 100 + tick * tick_in_ms)
+
+
+class TestServerResult(unittest.TestCase):
+
+    def test_result_of_previous_round_is_cleared(self):
+        player = Player("1", "player", PlayerRole.RUNNER, (100, 100))
+        field = Field(pymunk.Space(), player)
+        field.apply_network_event(NetworkEvent("game", "result", ("catcher", 250.0)))
+        self.assertEqual(field.server_result, (PlayerRole.CATCHER, 250.0))
+        field.apply_network_event(NetworkEvent("game", "start_countdown", None))
+        self.assertIsNone(field.server_result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+
+import pygame
+
+from scripts.headless import ScriptedInput
+
+
+class TestScriptedInput(unittest.TestCase):
+
+    def test_steps_become_events_on_their_frame(self):
+        script = ScriptedInput([[10, "mouse_down", [100, 200]], [0, "connect", None], [10, "ready", None]])
+        self.assertEqual([event.key for event in script.get_events(0)], [pygame.K_SPACE])
+        self.assertEqual(script.get_events(5), [])
+        events = script.get_events(12)
+        self.assertEqual([event.type for event in events], [pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN])
+        self.assertEqual(script.mouse_pos, (100, 200))
+
+    def test_unknown_command(self):
+        with self.assertRaises(ValueError):
+            ScriptedInput([[0, "jump", None]]).get_events(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+import unittest
+
+import pymunk
+
+from scripts.map import Map
+from server.map_format import MapFormatError, compile_map, compiled_map_to_dict, decode_compiled_map
+
+
+class TestCompiledMap(unittest.TestCase):
+
+    def setUp(self) -> None:
+        with open("server/first_map.json", "r") as file:
+            self.data = json.load(file)
+
+    def test_round_trip(self):
+        compiled_map = decode_compiled_map(compile_map(self.data))
+        self.assertEqual(compiled_map_to_dict(compiled_map), self.data)
+        self.assertEqual(compiled_map.walls.shape, (len(self.data["walls"]), 4))
+
+    def test_damaged_map(self):
+        compiled = compile_map(self.data)
+        with self.assertRaises(MapFormatError):
+            decode_compiled_map(compiled[:-1])
+        with self.assertRaises(MapFormatError):
+            decode_compiled_map(b"JSON" + compiled[4:])
+
+    def test_load_is_the_same_as_json(self):
+        json_map = Map(pymunk.Space())
+        json_map.set_map(self.data)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "map.ctm")
+            with open(path, "wb") as file:
+                file.write(compile_map(self.data))
+            compiled_map = Map(pymunk.Space())
+            compiled_map.load(path)
+            self.assertEqual(compiled_map.walls.tolist(), json_map.walls.tolist())
+            self.assertEqual(compiled_map.runner_start_pos.tolist(), json_map.runner_start_pos.tolist())
+            del compiled_map  # Arrays keep the file mapped
+
+    def test_shapes_only_near_player(self):
+        game_map = Map(pymunk.Space())
+        game_map.physics_margin = 100
+        game_map.set_map(self.data)
+        game_map.update_physics((50, 50))
+        self.assertEqual(sorted(game_map.shapes), [0, 1])  # Top and left borders
+        game_map.update_physics((500, 500))
+        self.assertNotIn(0, game_map.shapes)
+        self.assertEqual(len(game_map.space.shapes), len(game_map.shapes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+
+from server.metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_prometheus_text_format(self):
+        metrics = Metrics()
+        metrics.inc("messages_received_total", description="Received messages", action="ready")
+        metrics.inc("messages_received_total", action="ready")
+        metrics.gauge("lobby_players", lambda: 3, "Players in the lobby")
+        metrics.observe("message_latency_seconds", 0.003, (0.001, 0.01), description="Delay")
+        text = metrics.render()
+        self.assertIn('ctt_messages_received_total{action="ready"} 2', text)
+        self.assertIn("# TYPE ctt_lobby_players gauge\nctt_lobby_players 3", text)
+        self.assertIn('ctt_message_latency_seconds_bucket{le="0.001"} 0', text)
+        self.assertIn('ctt_message_latency_seconds_bucket{le="0.01"} 1', text)
+        self.assertIn('ctt_message_latency_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("ctt_message_latency_seconds_count 1", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import socket
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from scripts.map_cache import MapCache, get_map_hash
+from scripts.network import NetworkClient
+from server.trajectory import encode_trajectory
+from server.transfer_messages import receive_message, send_message
+
+
+class TestNetworkClient(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.client = NetworkClient(MapCache(self.cache_dir.name))
+        self.client.connect("127.0.0.1", self.listener.getsockname()[1])
+        self.server, _ = self.listener.accept()
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.client.thread.join(1)
+        self.server.close()
+        self.listener.close()
+        self.cache_dir.cleanup()
+
+    def wait_event(self):
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            event = self.client.get_event()
+            if event is not None:
+                return event
+            time.sleep(0.001)
+        self.fail("No network event")
+
+    def test_events_are_parsed_off_thread(self):
+        self.assertEqual(self.wait_event().action, "connected")
+        send_message(self.server, "game", "other_movement", b"abc!" + encode_trajectory([(1, 2), (3, 4)]), DEBUG=False)
+        send_message(self.server, "game", "result", "catcher 250.0", DEBUG=False)
+        self.assertEqual(self.wait_event().data, ("abc", [(1, 2), (3, 4)]))
+        self.assertEqual(self.wait_event().data, ("catcher", 250.0))
+
+    def test_malformed_message_is_dropped(self):
+        self.assertEqual(self.wait_event().action, "connected")
+        send_message(self.server, "game", "result", "catcher not-a-number", DEBUG=False)
+        send_message(self.server, "game", "map", "{broken json", DEBUG=False)
+        send_message(self.server, "game", "new_player", "uuid", DEBUG=False)
+        send_message(self.server, "game", "result", "runner", DEBUG=False)
+        self.assertEqual(self.wait_event().data, ("runner", None))
+        self.assertTrue(self.client.thread.is_alive())
+
+    def test_map_is_used_when_cache_fails(self):
+        raw_data = json.dumps({"name": "test"})
+        self.assertEqual(self.wait_event().action, "connected")
+        with mock.patch.object(self.client.map_cache, "put", side_effect=OSError("Read-only file system")):
+            send_message(self.server, "game", "map_hash", get_map_hash(raw_data), DEBUG=False)
+            receive_message(self.server, DEBUG=False)
+            send_message(self.server, "game", "map", raw_data, DEBUG=False)
+            self.assertEqual(self.wait_event().data, (get_map_hash(raw_data), {"name": "test"}))
+        self.assertTrue(self.client.thread.is_alive())
+
+    def test_map_with_wrong_hash_is_not_cached(self):
+        self.assertEqual(self.wait_event().action, "connected")
+        send_message(self.server, "game", "map_hash", get_map_hash("{}"), DEBUG=False)
+        receive_message(self.server, DEBUG=False)
+        send_message(self.server, "game", "map", json.dumps({"name": "other"}), DEBUG=False)
+        self.assertEqual(self.wait_event().data[1], {"name": "other"})
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+
+    def test_send_and_disconnect(self):
+        self.client.send("game", "ready", "1")
+        msg = receive_message(self.server, DEBUG=False)[0]
+        self.assertEqual((msg["action"], msg["parameters"]), ("ready", "1"))
+        self.server.close()
+        self.assertEqual(self.wait_event().action, "connected")
+        self.assertEqual(self.wait_event().action, "disconnected")
+
+    def test_map_is_requested_once(self):
+        raw_data = json.dumps({"name": "test"})
+        self.assertEqual(self.wait_event().action, "connected")
+        send_message(self.server, "game", "map_hash", get_map_hash(raw_data), DEBUG=False)
+        send_message(self.server, "game", "game_pos", "1", DEBUG=False)
+        msg = receive_message(self.server, DEBUG=False)[0]
+        self.assertEqual((msg["action"], msg["parameters"]), ("request_map", get_map_hash(raw_data)))
+        self.assertIsNone(self.client.get_event())  # game_pos waits for the map
+        send_message(self.server, "game", "map", raw_data, DEBUG=False)
+        self.assertEqual(self.wait_event().data, (get_map_hash(raw_data), {"name": "test"}))
+        self.assertEqual(self.wait_event().action, "game_pos")
+
+        # The second time the map is read from the cache
+        send_message(self.server, "game", "map_hash", get_map_hash(raw_data), DEBUG=False)
+        self.assertEqual(self.wait_event().data, (get_map_hash(raw_data), {"name": "test"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
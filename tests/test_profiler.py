@@ -0,0 +1,41 @@
+import json
+import os
+import tempfile
+import unittest
+
+from scripts.profiler import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.profiler = Profiler(max_events=3, max_frames=2)
+
+    def test_ring_buffers(self):
+        for frame in range(3):
+            for name in ("Physics", "Network"):
+                self.profiler.stop(name, self.profiler.start())
+            self.profiler.stop("Physics", self.profiler.start())
+            self.profiler.end_frame()
+        # Only the last events and frames are kept
+        self.assertEqual([event[0] for event in self.profiler.events], ["Physics", "Network", "Physics"])
+        self.assertEqual(len(self.profiler.frames), 2)
+        self.assertEqual(sorted(self.profiler.frames[-1]), ["Network", "Physics"])
+        self.assertEqual(self.profiler.current_frame, {})
+
+    def test_export_chrome_trace(self):
+        start = self.profiler.start()
+        self.profiler.stop("Rendering", start)
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.profiler.export_chrome_trace(os.path.join(directory, "trace.json"))
+            with open(path, "r") as file:
+                trace = json.load(file)
+        self.assertEqual(trace["displayTimeUnit"], "ms")
+        event = trace["traceEvents"][0]
+        self.assertEqual((event["name"], event["ph"], event["pid"]), ("Rendering", "X", os.getpid()))
+        self.assertEqual(event["ts"], start / 1000)
+        self.assertGreaterEqual(event["dur"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
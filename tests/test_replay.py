@@ -0,0 +1,111 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import numpy as np
+import pymunk
+
+from scripts.map import Map
+from scripts.replay import (ReplayError, ReplayLog, ReplayWriter, _locked, append_replay, encode_replay, get_index_path,
+                            rebuild_index)
+from scripts.simulation import Simulation
+
+
+def trajectories(players: int, ticks: int, shift: float = 0) -> np.ndarray:
+    times = np.arange(ticks, dtype=np.float64)
+    return np.stack([np.column_stack((times * (player + 1) + shift, np.full(ticks, player * 100.0))) for player in range(players)])
+
+
+def append_replays(path: str, player: int) -> None:
+    for shift in range(50):
+        append_replay(path, encode_replay([f"p{player}"], [True], trajectories(1, 100 + player, shift), 50, None, None))
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "replays.ctr")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        first = trajectories(2, 200)
+        second = trajectories(3, 50, shift=10)
+        self.assertEqual(append_replay(self.path, encode_replay(["a", "b"], [True, False], first, 50, "runner", None, "ab" * 32)), 0)
+        self.assertEqual(append_replay(self.path, encode_replay(["c", "d", "é"], [False, True, False], second, 50, "catcher", 1234.5)), 1)
+
+        log = ReplayLog(self.path)
+        self.assertEqual(len(log), 2)
+        replay = log[1]
+        self.assertEqual(replay.names, ["c", "d", "é"])
+        self.assertEqual(replay.is_catcher.tolist(), [False, True, False])
+        self.assertEqual((replay.winner, replay.catch_time_in_ms, replay.map_hash), ("catcher", 1234.5, None))
+        np.testing.assert_array_equal(replay.get_trajectories(), second)
+        self.assertEqual((log[0].winner, log[0].catch_time_in_ms, log[0].map_hash), ("runner", None, "ab" * 32))
+
+    def test_index_is_rebuilt(self):
+        for shift in range(3):
+            append_replay(self.path, encode_replay(["a", "b"], [True, False], trajectories(2, 20, shift), 50, "runner", None))
+        os.remove(get_index_path(self.path))
+        # Cut replay at the end of the log (e.g. the game was closed while writing)
+        with open(self.path, "ab") as file:
+            file.write(encode_replay(["a"], [True], trajectories(1, 20), 50, None, None)[:-8])
+
+        log = ReplayLog(self.path)
+        self.assertEqual(len(log), 3)
+        np.testing.assert_array_equal(log[2].get_trajectories(), trajectories(2, 20, 2))
+        self.assertEqual(os.path.getsize(get_index_path(self.path)), 3 * 8)
+
+    def test_appends_of_many_processes(self):
+        with ProcessPoolExecutor(4) as pool:
+            list(pool.map(append_replays, [self.path] * 4, range(4)))
+        log = ReplayLog(self.path)
+        self.assertEqual(len(log), 200)
+        for replay in log:
+            player = int(replay.names[0][1:])
+            self.assertEqual(replay.positions.shape, (100 + player, 1, 2))
+        # The index written by the processes is the same as the scanned one
+        offsets = log.offsets.copy()
+        np.testing.assert_array_equal(offsets, rebuild_index(self.path))
+
+    def test_writer_thread(self):
+        writer = ReplayWriter()
+        replay = encode_replay(["a"], [True], trajectories(1, 20), 50, None, None)
+        # The game loop doesn't wait while another process holds the lock
+        with open(self.path, "ab") as file, _locked(file):
+            start = time.perf_counter()
+            writer.save(self.path, replay)
+            writer.save(os.path.join(self.path, "not a directory", "replays.ctr"), replay)  # Error is only logged
+            writer.save(self.path, replay)
+            self.assertLess(time.perf_counter() - start, 0.5)
+        writer.close()
+        self.assertEqual(len(ReplayLog(self.path)), 2)
+
+    def test_name_with_new_line(self):
+        with self.assertRaises(ReplayError):
+            encode_replay(["a\nb"], [True], trajectories(1, 2), 50, None, None)
+
+    def test_simulation_from_replay(self):
+        movements = trajectories(2, 200)
+        append_replay(self.path, encode_replay(["a", "b"], [True, False], movements, 50, "catcher", 500))
+        with mock.patch("scripts.simulation.find_first_contact") as find_first_contact:
+            simulation = Simulation.from_replay(ReplayLog(self.path)[0], Map(pymunk.Space()))
+            self.assertEqual(simulation.catch_time_in_ms, 500)
+            find_first_contact.assert_not_called()  # The recorded result is used, the round is not searched
+
+        simulation.move_to(1025)
+        np.testing.assert_allclose(simulation.current_players_position, [(20.5, 0), (41, 100)])
+        simulation.move_to(0)
+        np.testing.assert_allclose(simulation.current_players_position, [(0, 0), (0, 100)])
+
+        simulation = Simulation.from_replay(ReplayLog(self.path)[0], Map(pymunk.Space()), use_recorded_result=False)
+        self.assertIsNone(simulation.catch_time_in_ms)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import asyncio
+import importlib.util
+import os
+import sys
+import unittest
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+
+from server.trajectory import decode_trajectory, encode_trajectory
+
+# Server modules import each other by name (the server runs as "python server/server.py")
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+sys.path.insert(0, SERVER_DIR)
+spec = importlib.util.spec_from_file_location("ctt_server", os.path.join(SERVER_DIR, "server.py"))
+server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(server)
+from player import ServerPlayer  # noqa: E402
+
+
+class BrokenPool(Executor):
+
+    def __init__(self) -> None:
+        self.is_shut_down = False
+
+    def submit(self, fn, /, *args, **kwargs):
+        raise BrokenProcessPool("A worker was killed")
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.is_shut_down = True
+
+
+class TestBrokenPool(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.broken_pool = BrokenPool()
+        server.RESOLVE_POOL = self.broken_pool
+
+    def tearDown(self) -> None:
+        if server.RESOLVE_POOL is not self.broken_pool:
+            server.RESOLVE_POOL.shutdown()
+        server.RESOLVE_POOL = None
+
+    def test_movement_is_clamped_and_pool_is_restarted(self):
+        player = ServerPlayer("name", "uuid")
+        player.start_pos = (100, 200)
+        movement = asyncio.run(server.validate_movement(player, encode_trajectory([(100, 200), (101, 200)])))
+        self.assertEqual(decode_trajectory(movement), [(100, 200)])
+        self.assertIsNot(server.RESOLVE_POOL, self.broken_pool)
+        self.assertTrue(self.broken_pool.is_shut_down)
+
+        # Other tasks which fail with the same broken pool don't replace the new pool again
+        new_pool = server.RESOLVE_POOL
+        server.restart_pool(self.broken_pool)
+        self.assertIs(server.RESOLVE_POOL, new_pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from scripts.player import PlayerRole
+from scripts.simulation import Simulation
+from server.trajectory import decode_trajectory, encode_trajectory
+
+
+class TestSimulation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.simulation = Simulation(["catcher", "runner"], [PlayerRole.CATCHER, PlayerRole.RUNNER],
+                                     [[(0, 0), (10, 0), (20, 0)], [(100, 100), (100, 110)]], None, 20)
+
+    def test_interpolation(self):
+        self.simulation.move_to(25)
+        self.assertEqual(self.simulation.current_players_position.tolist(), [[5, 0], [100, 105]])
+
+    def test_batch_positions(self):
+        positions = self.simulation.get_positions([0, 75, 1000])
+        self.assertEqual(positions.shape, (3, 2, 2))
+        self.assertEqual(positions[1].tolist(), [[15, 0], [100, 110]])
+        self.assertEqual(positions[2].tolist(), [[20, 0], [100, 110]])
+
+
+    def test_catch_time_from_quantized_trajectories(self):
+        # The catch time of the server is found on trajectories with 1/16 px precision,
+        # the recorded catcher is 0.031 px behind its quantized trajectory
+        catcher = [(i * 10 - 0.031, 0.0) for i in range(20)]
+        runner = [(150.0, 0.0)] * 20
+        quantized = [decode_trajectory(encode_trajectory(movement)) for movement in (catcher, runner)]
+        server_simulation = Simulation(["catcher", "runner"], [PlayerRole.CATCHER, PlayerRole.RUNNER], quantized, None, 20)
+
+        simulation = Simulation(["catcher", "runner"], [PlayerRole.CATCHER, PlayerRole.RUNNER], [catcher, runner], None, 20)
+        simulation.set_catch_time(server_simulation.catch_time_in_ms)
+        simulation.move_to(1000)
+        simulation.check_collision_between_catcher_and_runner()
+        self.assertTrue(simulation.collision_is_detected)
+        self.assertEqual(simulation.catches, [(0, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
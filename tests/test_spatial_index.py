@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from server.spatial_index import WallGrid, segment_entry
+
+
+class TestWallGrid(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(7)
+        positions = rng.uniform(0, 5000, (2000, 2))
+        self.bounds = np.hstack((positions, positions + rng.uniform(5, 300, (2000, 2))))
+        self.grid = WallGrid(self.bounds)
+        self.rng = rng
+
+    def test_queries_match_linear_scan(self):
+        bounds = self.bounds
+        for _ in range(100):
+            left, top = self.rng.uniform(-500, 5000, 2)
+            right, bottom = left + self.rng.uniform(0, 1000), top + self.rng.uniform(0, 1000)
+            expected = np.flatnonzero((bounds[:, 2] >= left) & (bounds[:, 0] <= right) & (bounds[:, 3] >= top) & (bounds[:, 1] <= bottom))
+            self.assertEqual(self.grid.query_rect(left, top, right, bottom).tolist(), expected.tolist())
+
+            x, y = self.rng.uniform(0, 5000, 2)
+            expected = np.flatnonzero((bounds[:, 0] <= x) & (x <= bounds[:, 2]) & (bounds[:, 1] <= y) & (y <= bounds[:, 3]))
+            self.assertEqual(self.grid.query_point(x, y).tolist(), expected.tolist())
+
+            start, end = self.rng.uniform(-500, 5500, (2, 2))
+            entry = segment_entry(bounds, start, end)
+            hits = self.grid.query_segment(*start, *end)
+            self.assertEqual(sorted(hits.tolist()), np.flatnonzero(np.isfinite(entry)).tolist())
+            self.assertTrue(np.all(np.diff(entry[hits]) >= 0))
+
+    def test_axis_aligned_segments(self):
+        grid = WallGrid([(100, 100, 200, 200), (300, 100, 400, 200)])
+        self.assertEqual(grid.query_segment(0, 150, 500, 150).tolist(), [0, 1])
+        self.assertEqual(grid.query_segment(500, 150, 0, 150).tolist(), [1, 0])
+        self.assertEqual(grid.query_segment(250, 0, 250, 500).tolist(), [])
+        self.assertEqual(grid.query_segment(150, 150, 150, 150).tolist(), [0])
+        self.assertEqual(WallGrid(np.zeros((0, 4))).query_rect(0, 0, 10, 10).tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import pygame
+
+from scripts.UI.text import Text
+
+
+class TestTextCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        pygame.font.init()
+        Text.clear_cache()
+
+    def tearDown(self) -> None:
+        Text.clear_cache()
+
+    def test_same_text_is_rendered_once(self):
+        first = Text("Player", (0, 0, 0), 14)
+        second = Text("Player", [0, 0, 0], 14)
+        self.assertIs(first.text_surface, second.text_surface)
+        self.assertEqual((Text.hits, Text.misses), (1, 1))
+
+    def test_fonts_are_keyed_by_type_and_size(self):
+        Text("a", (0, 0, 0), 14)
+        Text("a", (0, 0, 0), 20)
+        self.assertEqual(set(Text.fonts), {(None, 14), (None, 20)})
+
+    def test_least_recently_used_is_evicted(self):
+        max_surfaces = Text.max_surfaces
+        Text.max_surfaces = 2
+        try:
+            Text("a", (0, 0, 0), 14)
+            Text("b", (0, 0, 0), 14)
+            Text("a", (0, 0, 0), 14)
+            Text("c", (0, 0, 0), 14)
+            self.assertEqual([key[0] for key in Text.surfaces], ["a", "c"])
+        finally:
+            Text.max_surfaces = max_surfaces
+
+
+if __name__ == "__main__":
+    unittest.main()
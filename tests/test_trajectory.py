@@ -0,0 +1,66 @@
+import unittest
+import zlib
+
+from server.trajectory import (FIRST_POINT, FLAG_ZLIB, HEADER, MAGIC, MAX_POINTS, SCALE, TrajectoryError,
+                               decode_trajectory, encode_trajectory)
+
+
+class TestTrajectory(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.points = [(950.0, 950.0), (949.7481897501978, 948.8164918259286), (948.9761103892333, 945.1877188293947),
+                       (947.7147699561312, 939.2594187938176), (945.8713524414617, 930.5953564748698)]
+
+    def assert_close(self, decoded, points, scale=16):
+        self.assertEqual(len(decoded), len(points))
+        for (x1, y1), (x2, y2) in zip(decoded, points):
+            self.assertLessEqual(abs(x1 - x2), 0.5 / scale)
+            self.assertLessEqual(abs(y1 - y2), 0.5 / scale)
+
+    def test_round_trip(self):
+        self.assert_close(decode_trajectory(encode_trajectory(self.points)), self.points)
+        self.assert_close(decode_trajectory(encode_trajectory(self.points, compress=False)), self.points)
+
+    def test_large_jump_uses_wide_deltas(self):
+        points = [(0.0, 0.0), (5000.0, -5000.0), (0.5, 0.25)]
+        self.assert_close(decode_trajectory(encode_trajectory(points)), points)
+
+    def test_empty(self):
+        self.assertEqual(decode_trajectory(encode_trajectory([])), [])
+
+    def test_smaller_than_text(self):
+        points = [(950.0 - i * 1.37, 950.0 - i * 2.11) for i in range(200)]
+        self.assertLess(len(encode_trajectory(points)), len(str(points)) / 10)
+
+    def test_wrong_data(self):
+        with self.assertRaises(TrajectoryError):
+            decode_trajectory(b"[(950.0, 950.0)]")
+
+    def test_damaged_compressed_body(self):
+        data = encode_trajectory(self.points)
+        with self.assertRaises(TrajectoryError):
+            decode_trajectory(data[:-4] + b"\xff\xff\xff\xff")
+
+    def test_body_is_not_multiple_of_delta_size(self):
+        data = encode_trajectory(self.points, compress=False)
+        with self.assertRaises(TrajectoryError):
+            decode_trajectory(data[:-1])
+        with self.assertRaises(TrajectoryError):
+            decode_trajectory(data[:10])
+
+
+    def test_compressed_body_bigger_than_header(self):
+        # 2 points in the header, but megabytes of zeros in the body
+        data = encode_trajectory(self.points[:2])[:HEADER.size + FIRST_POINT.size] + zlib.compress(b"\0" * 10 ** 7)
+        with self.assertRaises(TrajectoryError):
+            decode_trajectory(data)
+
+    def test_too_many_points(self):
+        data = bytearray(encode_trajectory(self.points))
+        HEADER.pack_into(data, 0, MAGIC, FLAG_ZLIB, SCALE, MAX_POINTS + 1)
+        with self.assertRaises(TrajectoryError):
+            decode_trajectory(bytes(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
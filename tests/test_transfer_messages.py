@@ -0,0 +1,77 @@
+import socket
+import threading
+import unittest
+
+from server import transfer_messages
+from server.transfer_messages import DisconnectError, ProtocolError, encode_message, receive_message, send_message
+
+
+class TestFraming(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.a, self.b = socket.socketpair()
+
+    def tearDown(self) -> None:
+        self.a.close()
+        self.b.close()
+
+    def drain(self) -> None:
+        while self.b.recv(65536):
+            pass
+
+    def test_text_and_empty_parameters(self):
+        send_message(self.a, "auth", "connect", DEBUG=False)
+        send_message(self.a, "game", "ready", "1", DEBUG=False)
+        msgs = receive_message(self.b, DEBUG=False)
+        while len(msgs) < 2:
+            msgs += receive_message(self.b, DEBUG=False)
+        self.assertEqual([(m["type"], m["action"], m["parameters"]) for m in msgs],
+                         [("auth", "connect", None), ("game", "ready", "1")])
+
+    def test_reserved_words_and_unicode(self):
+        text = "NEXT END CON ąęść " * 500
+        send_message(self.a, "game", "new_player", text, DEBUG=False)
+        msgs = receive_message(self.b, length=7, DEBUG=False)
+        self.assertEqual(msgs[0]["parameters"], text)
+
+    def test_binary_parameters(self):
+        payload = bytes(range(256)) * 100
+        send_message(self.a, "game", "movement", payload, DEBUG=False)
+        msgs = receive_message(self.b, DEBUG=False)
+        self.assertEqual(msgs[0]["parameters"], payload)
+
+    def test_split_frame(self):
+        frame = encode_message("game", "map", "x" * 100)
+        self.a.sendall(frame[:10])
+        self.a.sendall(frame[10:])
+        self.assertEqual(receive_message(self.b, DEBUG=False)[0]["parameters"], "x" * 100)
+
+    def test_old_protocol_is_rejected(self):
+        self.a.sendall(b"1700000000.0NEXTauthNEXTconnectNEXTEND")
+        with self.assertRaises(ProtocolError):
+            receive_message(self.b, DEBUG=False)
+
+    def test_logging_is_truncated_and_sampled(self):
+        # About 100 KB are sent, the peer is drained so small socket buffers never block the sender
+        drain = threading.Thread(target=self.drain, daemon=True)
+        drain.start()
+        transfer_messages._sample_counters.clear()
+        with self.assertLogs("ctt.protocol", "DEBUG") as logs:
+            for _ in range(20):
+                send_message(self.a, "game", "movement", b"x" * 5000)
+            send_message(self.a, "game", "map", "y" * 5000)
+        self.a.shutdown(socket.SHUT_WR)
+        drain.join(1)
+        self.assertEqual(len(logs.output), 3)
+        self.assertIn("<5000 bytes>", logs.output[0])
+        self.assertIn("(5000 chars)", logs.output[2])
+        self.assertLess(len(logs.output[2]), 500)
+
+    def test_disconnect(self):
+        self.a.close()
+        with self.assertRaises(DisconnectError):
+            receive_message(self.b, DEBUG=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
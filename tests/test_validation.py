@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+from server.map_format import get_map_walls, get_walls_bounds
+from server.spatial_index import WallGrid
+from server.trajectory import decode_trajectory, encode_trajectory
+from server.validation import validate_trajectory
+
+# Server modules import each other by name (the server runs as "python server/server.py")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server"))
+import match  # noqa: E402
+
+TICK_IN_MS = 50
+ACCELERATION = 1000  # PLAYER_SPEED / PLAYER_MASS
+
+
+class TestValidation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.walls_index = WallGrid(get_walls_bounds(get_map_walls((1000, 1000), [(480, 0, 40, 1000)])))
+
+    def validate(self, points, start=(100, 100)):
+        return validate_trajectory(points, start, self.walls_index, TICK_IN_MS, ACCELERATION, 200)
+
+    def test_full_acceleration_is_valid(self):
+        times = np.arange(100) * TICK_IN_MS / 1000
+        points = [(100, 100 + ACCELERATION * t * t / 2) for t in times[:25]]
+        valid_points, report = self.validate(points)
+        self.assertEqual({check: result["violations"] for check, result in report.items()},
+                         {"length": 0, "start": 0, "speed": 0, "walls": 0})
+        self.assertEqual(valid_points.tolist(), np.array(points).tolist())
+
+    def test_teleport_and_walls_are_clamped(self):
+        points = [(100, 100)] * 10 + [(700, 100)] * 10
+        valid_points, report = self.validate(points)
+        self.assertEqual(report["speed"]["violations"], 1)
+        self.assertEqual(report["walls"]["violations"], 1)
+        self.assertTrue(np.all(valid_points[:, 0] < 480))  # The player never gets through the wall
+        self.assertTrue(np.all(np.diff(valid_points[:, 0]) >= 0))
+
+    def test_start_and_length(self):
+        valid_points, report = self.validate([(300, 300)] * 250)
+        self.assertEqual(len(valid_points), 200)
+        self.assertEqual(report["length"]["violations"], 50)
+        self.assertEqual(report["start"]["violations"], 1)
+        self.assertEqual(valid_points[0].tolist(), [100, 100])
+        self.assertEqual(self.validate([])[0].tolist(), [[100, 100]])
+
+
+class TestCheckMovement(unittest.TestCase):
+
+    def setUp(self) -> None:
+        match.init_worker(get_walls_bounds(get_map_walls((1000, 1000), [])))
+
+    def test_valid_movement_is_not_changed(self):
+        movement = encode_trajectory([(100, 100), (100, 101)])
+        self.assertIs(match.check_movement(movement, (100, 100), TICK_IN_MS, ACCELERATION, 200)[0], movement)
+
+    def test_malformed_movement_is_clamped_to_start(self):
+        damaged_zlib = encode_trajectory([(100, 100), (100, 101)])[:-4] + b"\xff\xff\xff\xff"
+        misaligned = encode_trajectory([(100, 100), (100, 101)], compress=False)[:-1]
+        for movement in (damaged_zlib, misaligned, b"garbage"):
+            valid_movement, report = match.check_movement(movement, (100, 100), TICK_IN_MS, ACCELERATION, 200)
+            self.assertEqual(decode_trajectory(valid_movement), [(100, 100)])
+            self.assertEqual(report["start"]["violations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()